@@ -1,10 +1,13 @@
-from typing import Awaitable, Callable, Union
+import asyncio
+import inspect
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 
 from langgraph.graph.state import CompiledStateGraph
 
-from agents.research_assistant import research_assistant
 from agents.mcp_agent import get_research_assistant as get_mcp_agent
+from agents.research_assistant import research_assistant
 from schema import AgentInfo
 
 DEFAULT_AGENT = "mcp-agent"
@@ -12,35 +15,59 @@ DEFAULT_AGENT = "mcp-agent"
 @dataclass
 class Agent:
     description: str
-    graph: CompiledStateGraph
+    # Either the compiled graph itself, or an async getter that builds it on first use.
+    # Compiled graphs are wrapped in a getter so every entry is resolved the same way.
+    graph: CompiledStateGraph | Callable[[], Awaitable[CompiledStateGraph]]
+    # Whether get_agent may keep the graph for good. Getters whose graph can go stale, e.g. when
+    # it was built before all of its tools were discovered, keep their own graph and are called
+    # on every lookup instead.
+    cache: bool = True
+
+    def __post_init__(self) -> None:
+        if not inspect.iscoroutinefunction(self.graph):
+            graph = self.graph
+
+            async def get_graph() -> CompiledStateGraph:
+                return graph
 
-# Define agent getters - can be either sync (returning the graph directly) or async (returning a promise of a graph)
-AGENTS: dict[str, Union[CompiledStateGraph, Callable[[], Awaitable[CompiledStateGraph]]]] = {
-    "research-assistant": research_assistant,
-    "mcp-agent": get_mcp_agent,
+            self.graph = get_graph
+
+agents: dict[str, Agent] = {
+    "research-assistant": Agent(
+        description="Ask me anything! I can search for information and do calculations.",
+        graph=research_assistant,
+    ),
+    "mcp-agent": Agent(
+        description="Research assistant with access to knowledge graphs and MCP tools.",
+        graph=get_mcp_agent,
+        cache=False,
+    ),
 }
 
+# Graphs returned by the cacheable getters, so each of them runs once per process
+_agent_cache: dict[str, CompiledStateGraph] = {}
+_agent_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
 async def get_agent(agent_id: str = DEFAULT_AGENT) -> CompiledStateGraph:
     """Get an agent by ID."""
-    agent_getter = AGENTS.get(agent_id)
-    if not agent_getter:
+    if agent_id in _agent_cache:
+        return _agent_cache[agent_id]
+
+    agent = agents.get(agent_id)
+    if not agent:
         raise ValueError(f"Agent {agent_id} not found")
-    
-    # If agent_getter is already a CompiledStateGraph, return it directly
-    if isinstance(agent_getter, CompiledStateGraph):
-        return agent_getter
-    # Otherwise, call the async function to get the agent
-    return await agent_getter()
+    # These getters guard their own rebuilds, so lookups don't queue up on the lock below
+    if not agent.cache:
+        return await agent.graph()
+
+    # Concurrent first requests wait on the same lock so the graph is only built once
+    async with _agent_locks[agent_id]:
+        if agent_id not in _agent_cache:
+            _agent_cache[agent_id] = await agent.graph()
+    return _agent_cache[agent_id]
 
 def get_all_agent_info() -> list[AgentInfo]:
     """Get info about all available agents."""
     return [
-        AgentInfo(
-            key="research-assistant",
-            description="Ask me anything! I can search for information and do calculations."
-        ),
-        AgentInfo(
-            key="mcp-agent",
-            description="Research assistant with access to knowledge graphs and MCP tools."
-        )
+        AgentInfo(key=agent_id, description=agent.description) for agent_id, agent in agents.items()
     ]
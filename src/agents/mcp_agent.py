@@ -1,73 +1,135 @@
 from datetime import datetime
-from typing import Literal, Dict, Any
+from typing import Any
+import asyncio
+import hashlib
 import json
+import logging
 import os
 import os.path
 import re
+import textwrap
+import time
+from types import MappingProxyType
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
+from functools import lru_cache
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import AIMessage, SystemMessage
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.messages import AIMessage, AnyMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
 from langgraph.graph import END, MessagesState, StateGraph
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.managed import RemainingSteps
-from langgraph.prebuilt import create_react_agent
-from agents.llama_guard import LlamaGuard, LlamaGuardOutput, SafetyAssessment
+from langgraph.prebuilt import ToolNode, create_react_agent, tools_condition
+from agents.llama_guard import LlamaGuardOutput
 from core import get_model, settings
+from schema.models import AnthropicModelName
 from pydantic import SecretStr
 from langchain_mcp_adapters.client import MultiServerMCPClient
 
-# Ensure directories exist
-os.makedirs(settings.MEMORY_DIR_PATH, exist_ok=True)
-os.makedirs(settings.DATA_DIR_PATH, exist_ok=True)
-os.makedirs(settings.CONFIG_DIR_PATH, exist_ok=True)
+try:
+    import orjson
+except ImportError:  # orjson comes in with langsmith, but stay usable without it
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+def _json_loads(data: str | bytes) -> Any:
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def _json_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    return json.dumps(obj, sort_keys=sort_keys).encode()
+
+_dirs_ready = False
+
+def _ensure_dirs() -> None:
+    """Create the memory, data and config directories, once per process."""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    for path in (settings.MEMORY_DIR_PATH, settings.DATA_DIR_PATH, settings.CONFIG_DIR_PATH):
+        os.makedirs(path, exist_ok=True)
+    _dirs_ready = True
+
+# Matches ${VAR_NAME} placeholders in the MCP config
+_CONFIG_VAR_PATTERN = re.compile(rb'\${([A-Za-z0-9_]+)}')
+
+def _setting_value(var_name: str) -> str:
+    """Value from settings for a ${VAR_NAME} placeholder, or "" if there is no such setting."""
+    if not hasattr(settings, var_name):
+        return ""
+    attr = getattr(settings, var_name)
+    # Handle SecretStr values
+    if isinstance(attr, SecretStr):
+        return attr.get_secret_value()
+    return str(attr)
+
+@lru_cache(maxsize=4)
+def _read_mcp_config(path: str, mtime: float) -> dict[str, Any]:
+    """Read and parse the MCP config, memoized until the file changes."""
+    # Read the config file as bytes, the JSON parser takes them as they are
+    with open(path, 'rb') as f:
+        config_bytes = f.read()
+    
+    # Look each referenced setting up once, then replace every ${VAR_NAME} in a single pass
+    values = {
+        name: _setting_value(name.decode()).encode()
+        for name in set(_CONFIG_VAR_PATTERN.findall(config_bytes))
+    }
+    config_bytes = _CONFIG_VAR_PATTERN.sub(lambda m: values[m.group(1)], config_bytes)
+    
+    # Parse the processed bytes as JSON
+    config = _json_loads(config_bytes)
+    return config.get('servers', {})
 
 # Load MCP server configuration from JSON file
-def load_mcp_config() -> Dict[str, Any]:
+def load_mcp_config() -> dict[str, Any]:
+    _ensure_dirs()
+    path = settings.MCP_CONFIG_FILE_PATH
     try:
-        # Read the config file as text
-        with open(settings.MCP_CONFIG_FILE_PATH, 'r') as f:
-            config_text = f.read()
-        
-        # Find all ${VAR_NAME} patterns in the config
-        var_pattern = r'\${([A-Za-z0-9_]+)}'
-        matches = re.findall(var_pattern, config_text)
-        
-        # Replace each variable with its value from settings
-        for var_name in matches:
-            value = ""
-            if hasattr(settings, var_name):
-                attr = getattr(settings, var_name)
-                # Handle SecretStr values
-                if isinstance(attr, SecretStr):
-                    value = attr.get_secret_value()
-                else:
-                    value = str(attr)
-            
-            config_text = config_text.replace(f"${{{var_name}}}", value)
-        
-        # Parse the processed text as JSON
-        config = json.loads(config_text)
-        return config.get('servers', {})
+        return _read_mcp_config(path, os.path.getmtime(path))
     except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error loading MCP config from {settings.MCP_CONFIG_FILE_PATH}: {e}")
+        logger.error(f"Error loading MCP config from {path}: {e}")
         # Return a default empty config
         return {}
 
-# Get the MCP server configuration
-SERVERS_CONFIG = load_mcp_config()
+def _freeze(value: Any) -> Any:
+    """Read-only copy of a parsed JSON value: mappings become MappingProxyType, lists tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _thaw(value: Any) -> Any:
+    """Mutable copy of a value built by _freeze."""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+# Get the MCP server configuration. It is read-only so nothing can change it under the running
+# clients, and its hash keys the tool manifest.
+_servers_config = load_mcp_config()
+SERVERS_CONFIG: Mapping[str, Any] = _freeze(_servers_config)
+SERVERS_CONFIG_HASH = hashlib.sha256(_json_dumps(_servers_config, sort_keys=True)).hexdigest()
+del _servers_config
 
 class AgentState(MessagesState, total=False):
     """State for the research assistant agent."""
     safety: LlamaGuardOutput
     remaining_steps: RemainingSteps
 
-current_date = datetime.now().strftime("%B %d, %Y")
-instructions = f"""
+_RAW_INSTRUCTIONS = """
 ## === System Prompt for Memory-Powered Assistant =================================
 You are an intelligent research assistant with access to:
 - A **knowledge graph memory server** (MCP "memory") that stores entities, relations, & observations.
 - A **web search tool** ("Perplexity/Sonar") for fresh or missing information.
 
-Today's date: {current_date}.
+Today's date: {date}.
 
 --------------------------- 0. On Every Turn --------------------------------------
 Do **all** of the following *before* crafting your visible reply:
@@ -116,56 +178,481 @@ Periodically prune with **delete_observations / delete_entities** if data become
 - Perplexity/Sonar - powerful web search for current events, facts, and information not in memory.
 - Knowledge Graph - create/update/search entities, relations, and observations in persistent memory.
 
+When several tool calls don't depend on each other's results (e.g. search_nodes for different
+keywords, or create_entities + add_observations for unrelated nodes), request them together in a
+single turn - they run in parallel.
+
 NOTE: THE USER CAN'T SEE THE TOOL RESPONSE.
 """
 
-_mcp_client = None
+# Trailing whitespace only costs tokens on every model call, strip it once up front
+_INSTRUCTIONS_TEMPLATE = re.sub(r'[ \t]+$', '', textwrap.dedent(_RAW_INSTRUCTIONS).strip(), flags=re.M)
+
+@lru_cache(maxsize=1)
+def _instructions_for(date: str) -> str:
+    return _INSTRUCTIONS_TEMPLATE.format(date=date)
+
+def build_instructions() -> str:
+    """System prompt with today's date filled in."""
+    return _instructions_for(datetime.now().strftime("%B %d, %Y"))
+
+def _instructions_prompt(state: AgentState) -> list:
+    """Prepend the system prompt, built per request so the date doesn't go stale in a long-lived process."""
+    return [SystemMessage(content=build_instructions()), *state["messages"]]
+
+def _cached_instructions_prompt(state: AgentState) -> list:
+    """Like _instructions_prompt, but marks the system prompt for Anthropic prompt caching.
+
+    The instructions are the same on every turn, so after the first call Anthropic serves them
+    from its cache at a fraction of the input token cost.
+    """
+    system = SystemMessage(
+        content=[{"type": "text", "text": build_instructions(), "cache_control": {"type": "ephemeral"}}]
+    )
+    return [system, *state["messages"]]
+
+_mcp_clients: dict[str, MultiServerMCPClient] = {}
+_mcp_server_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+# Tools listed by each connected server, keyed by tool name
+_mcp_tools_by_name: dict[str, dict[str, BaseTool]] = {}
+# Task owning each server's client, and the event that tells it to shut the client down
+_mcp_server_tasks: dict[str, asyncio.Task] = {}
+_mcp_server_stops: dict[str, asyncio.Event] = {}
+# Servers a start was attempted for, whether or not they came up. The supervisor keeps these
+# alive, requests only ever start the others.
+_mcp_started_servers: set[str] = set()
+
+def _tool_manifest_path() -> str:
+    """Path of the tool manifest for the current MCP server configuration."""
+    return os.path.join(settings.MEMORY_DIR_PATH, f"mcp-tools-{SERVERS_CONFIG_HASH[:16]}.json")
+
+def _load_tool_manifest() -> dict[str, list[dict[str, Any]]] | None:
+    """Load the tool schemas recorded by a previous run, if any."""
+    try:
+        with open(_tool_manifest_path(), 'rb') as f:
+            return _json_loads(f.read())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _tool_specs(clients: dict[str, MultiServerMCPClient]) -> dict[str, list[dict[str, Any]]]:
+    """Name, description and argument schema of each connected server's tools."""
+    return {
+        server_name: [
+            {"name": t.name, "description": t.description, "args_schema": t.args_schema}
+            for t in client.get_tools()
+        ]
+        for server_name, client in clients.items()
+    }
+
+def _save_tool_manifest(specs: dict[str, list[dict[str, Any]]]) -> None:
+    """Record the tool schemas of the servers so later cold starts can skip connecting."""
+    try:
+        with open(_tool_manifest_path(), 'wb') as f:
+            f.write(_json_dumps(specs))
+    except (OSError, TypeError) as e:
+        logger.warning(f"Error saving MCP tool manifest: {e}")
+
+def _refresh_tool_manifest(server_name: str, client: MultiServerMCPClient) -> None:
+    """Update the manifest if a server's live tools differ from the ones it recorded.
+
+    The manifest is keyed on the server configuration only, so a server that changes its tools
+    without a config change would otherwise keep being offered with its old ones.
+    """
+    global _tools
+    manifest = _load_tool_manifest()
+    if manifest is None:
+        return
+    live = _tool_specs({server_name: client})[server_name]
+    if _json_dumps(manifest.get(server_name), sort_keys=True) == _json_dumps(live, sort_keys=True):
+        return
+    logger.info(f"MCP server {server_name} changed its tools, updating the tool manifest")
+    manifest[server_name] = live
+    _save_tool_manifest(manifest)
+    # The next get_tools call builds the stand-ins from the updated manifest
+    _tools = None
+
+async def _run_server(server_name: str, ready: asyncio.Future, stop: asyncio.Event) -> None:
+    """Own a server's client for its whole lifetime.
+
+    The stdio transport must be entered and exited from the same task, so the client is held open
+    here until stop is set rather than being closed from whichever task happens to shut down.
+    """
+    # The client adds PATH to the server's env in place, so it gets its own mutable copy
+    client = MultiServerMCPClient({server_name: _thaw(SERVERS_CONFIG[server_name])})
+    try:
+        async with client:
+            ready.set_result(client)
+            await stop.wait()
+    except Exception as e:
+        if not ready.done():
+            ready.set_exception(e)
+        else:
+            logger.warning(f"MCP server {server_name} exited with an error: {e}")
+    finally:
+        if not ready.done():
+            ready.cancel()
+        logger.info(f"MCP server {server_name} stopped")
+
+async def _connect_server(server_name: str, restart: bool = False) -> MultiServerMCPClient | None:
+    """Start a single MCP server and connect to it.
+
+    Each server is started at most once this way. Bringing back one that failed to start or
+    stopped is left to the supervisor, which passes restart=True, so a request never waits on a
+    respawn of a broken server.
+    """
+    global _tools
+    if server_name in _mcp_clients:
+        return _mcp_clients[server_name]
+    if server_name in _mcp_started_servers and not restart:
+        return None
+    async with _mcp_server_locks[server_name]:
+        if server_name not in _mcp_clients:
+            if server_name in _mcp_started_servers and not restart:
+                return None
+            _mcp_started_servers.add(server_name)
+            ready = asyncio.get_running_loop().create_future()
+            stop = asyncio.Event()
+            task = asyncio.create_task(_run_server(server_name, ready, stop))
+            start = time.perf_counter()
+            try:
+                client = await ready
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Error initializing MCP server {server_name}: {e}")
+                return None
+            logger.info(f"MCP server {server_name} started in {time.perf_counter() - start:.2f}s")
+            _mcp_tools_by_name[server_name] = {t.name: t for t in client.get_tools()}
+            _refresh_tool_manifest(server_name, client)
+            _mcp_server_tasks[server_name] = task
+            _mcp_server_stops[server_name] = stop
+            _mcp_clients[server_name] = client
+            # Its tools were left out of the cached list, discover them on the next get_tools call
+            if server_name in _tools_missing:
+                _tools = None
+    return _mcp_clients[server_name]
+
+async def _stop_server(server_name: str) -> None:
+    """Close a server's client and wait for its process to exit."""
+    _mcp_clients.pop(server_name, None)
+    _mcp_tools_by_name.pop(server_name, None)
+    stop = _mcp_server_stops.pop(server_name, None)
+    task = _mcp_server_tasks.pop(server_name, None)
+    if stop and task:
+        stop.set()
+        await asyncio.gather(task, return_exceptions=True)
+
+async def is_mcp_server_running(server_name: str) -> bool:
+    """Check whether a server is connected and still answers a ping."""
+    client = _mcp_clients.get(server_name)
+    task = _mcp_server_tasks.get(server_name)
+    if client is None or task is None or task.done():
+        return False
+    try:
+        await asyncio.wait_for(client.sessions[server_name].send_ping(), timeout=10)
+    except Exception:
+        return False
+    return True
+
+async def _connect_all_servers() -> dict[str, MultiServerMCPClient]:
+    """Start every configured MCP server concurrently.
+
+    Each server has its own client, so startup takes as long as the slowest server and a server
+    that fails to start doesn't take the others down with it. The client lists a server's tools
+    as part of connecting to it, so tool listing runs concurrently across servers as well.
+    """
+    results = await asyncio.gather(*(_connect_server(name) for name in SERVERS_CONFIG))
+    clients = {name: client for name, client in zip(SERVERS_CONFIG, results) if client}
+    # Only record complete tool sets, a partial manifest would hide tools for good
+    if clients and len(clients) == len(SERVERS_CONFIG):
+        _save_tool_manifest(_tool_specs(clients))
+    return clients
+
+async def warmup_mcp_servers() -> None:
+    """Start the servers in MCP_WARMUP_SERVERS ahead of their first tool call.
 
-async def get_tools():
-    """Get tools from MCP servers."""
-    global _mcp_client
-    if _mcp_client is None:
-        _mcp_client = MultiServerMCPClient(SERVERS_CONFIG)
+    The others keep starting on first use, so a session that never calls their tools never
+    spawns them.
+    """
+    names = [name for name in settings.MCP_WARMUP_SERVERS if name in SERVERS_CONFIG]
+    await asyncio.gather(*(_connect_server(name) for name in names))
+
+# Longest wait between restart attempts of a server that keeps failing to come back
+_MCP_MAX_RESTART_DELAY = 3600.0
+# Failed restart attempts in a row per server, and when the next one is due
+_mcp_restart_backoff: dict[str, tuple[int, float]] = {}
+
+async def _supervise_server(server_name: str) -> None:
+    """Restart a started server that stopped answering.
+
+    While restarts keep failing, the wait before the next attempt doubles each time, from
+    MCP_HEALTH_CHECK_INTERVAL up to _MCP_MAX_RESTART_DELAY.
+    """
+    failures, retry_at = _mcp_restart_backoff.get(server_name, (0, 0.0))
+    if time.monotonic() < retry_at or await is_mcp_server_running(server_name):
+        return
+    if server_name in _mcp_clients:
+        logger.warning(f"MCP server {server_name} is not responding, restarting it")
+    else:
+        logger.info(f"Retrying to start MCP server {server_name}")
+    await _stop_server(server_name)
+    if await _connect_server(server_name, restart=True):
+        _mcp_restart_backoff.pop(server_name, None)
+        return
+    delay = min(settings.MCP_HEALTH_CHECK_INTERVAL * 2**failures, _MCP_MAX_RESTART_DELAY)
+    _mcp_restart_backoff[server_name] = (failures + 1, time.monotonic() + delay)
+
+async def supervise_mcp_servers() -> None:
+    """Ping started MCP servers periodically and restart the ones that stopped answering.
+
+    Servers that failed to start are retried the same way. Servers that were never started are
+    left alone, they start on their first tool call. The servers are checked concurrently, so a
+    slow restart doesn't hold up the others' pings.
+    """
+    while True:
+        await asyncio.sleep(settings.MCP_HEALTH_CHECK_INTERVAL)
+        await asyncio.gather(*(_supervise_server(name) for name in list(_mcp_started_servers)))
+
+async def shutdown_mcp_servers() -> None:
+    """Stop all running MCP servers."""
+    await asyncio.gather(*(_stop_server(name) for name in list(_mcp_clients)))
+
+_TOOL_RESULT_CACHE_SIZE = 2048
+# Recent results of cacheable tools per server, keyed by (tool name, serialized arguments) and
+# stored with the time they were fetched
+_tool_results: dict[str, OrderedDict[tuple[str, bytes], tuple[float, Any]]] = defaultdict(OrderedDict)
+# Bumped per server when one of its other tools starts and when it finishes, so a cacheable call
+# that overlapped it doesn't store a result that may predate the change
+_tool_generations: dict[str, int] = defaultdict(int)
+
+def _invalidate_tool_results(server_name: str) -> None:
+    _tool_generations[server_name] += 1
+    _tool_results.pop(server_name, None)
+
+async def _call_live_tool(server_name: str, tool_name: str, arguments: dict[str, Any]) -> Any:
+    await _connect_server(server_name)
+    live_tool = _mcp_tools_by_name.get(server_name, {}).get(tool_name)
+    if live_tool is None:
+        raise ToolException(f"MCP tool {tool_name} is not available")
+    return await live_tool.coroutine(**arguments)
+
+async def _call_cached_tool(server_name: str, tool_name: str, arguments: dict[str, Any]) -> Any:
+    """Call a read-only tool, reusing a result fetched within the last MCP_TOOL_CACHE_TTL seconds."""
+    results = _tool_results[server_name]
+    key = (tool_name, _json_dumps(arguments, sort_keys=True))
+    cached = results.get(key)
+    if cached and time.monotonic() - cached[0] < settings.MCP_TOOL_CACHE_TTL:
+        results.move_to_end(key)
+        return cached[1]
+    generation = _tool_generations[server_name]
+    result = await _call_live_tool(server_name, tool_name, arguments)
+    # Another tool of the server ran meanwhile, the result may be from before its change
+    if _tool_generations[server_name] != generation:
+        return result
+    results = _tool_results[server_name]
+    results[key] = (time.monotonic(), result)
+    results.move_to_end(key)
+    if len(results) > _TOOL_RESULT_CACHE_SIZE:
+        results.popitem(last=False)
+    return result
+
+def _lazy_mcp_tool(server_name: str, spec: dict[str, Any]) -> BaseTool:
+    """Build a stand-in for an MCP tool that calls whichever session of its server is current.
+
+    The server is started on the first call, and a server restarted by the supervisor is picked up
+    without rebuilding the agent. Results of the tools in MCP_CACHEABLE_TOOLS are cached, any other
+    tool of the same server may change them and clears that server's cache.
+    """
+    tool_name = spec["name"]
+
+    async def call_tool(**arguments: Any):
+        if tool_name in settings.MCP_CACHEABLE_TOOLS:
+            return await _call_cached_tool(server_name, tool_name, arguments)
+        _invalidate_tool_results(server_name)
         try:
-            await _mcp_client.__aenter__()
-        except Exception as e:
-            print(f"Error initializing MCP client: {e}")
-            return []
-    return _mcp_client.get_tools()
+            return await _call_live_tool(server_name, tool_name, arguments)
+        finally:
+            _invalidate_tool_results(server_name)
+
+    return StructuredTool(
+        name=spec["name"],
+        description=spec["description"],
+        args_schema=spec["args_schema"],
+        coroutine=call_tool,
+        response_format="content_and_artifact",
+    )
+
+_tools: list[BaseTool] | None = None
+_tools_lock = asyncio.Lock()
+# Bumped every time a tool list is cached, so agents can tell theirs went stale
+_tools_version = 0
+# Servers that failed to start during discovery, so their tools aren't in _tools
+_tools_missing: set[str] = set()
+
+def mcp_tools_version() -> int | None:
+    """Version of the cached tool list, or None until the tools are discovered (again).
+
+    An agent built from the cached tool list stays valid as long as the version doesn't change.
+    """
+    return _tools_version if _tools is not None else None
 
-async def initialize_agent(model_name: str | None = None):
+async def get_tools() -> list[BaseTool]:
+    """Get tools from MCP servers.
+
+    If a tool manifest recorded for the same server configuration exists, each server is only
+    started when one of its tools is first called. Otherwise all servers are started to discover
+    their tools. The tool list is built once and shared by every agent instance, concurrent first
+    callers wait for the same discovery.
+
+    A server that fails to start is retried by the supervisor, not here. The list is cached
+    without its tools and dropped once it comes up, which bumps the version.
+    """
+    global _tools, _tools_version, _tools_missing
+    if _tools is not None:
+        return _tools
+    async with _tools_lock:
+        if _tools is not None:
+            return _tools
+        manifest = _load_tool_manifest()
+        if manifest is None:
+            manifest = _tool_specs(await _connect_all_servers())
+        _tools_missing = set(SERVERS_CONFIG) - set(manifest)
+        _tools = [
+            _lazy_mcp_tool(server_name, spec)
+            for server_name, specs in manifest.items()
+            for spec in specs
+        ]
+        _tools_version += 1
+        return _tools
+
+_TOOL_SEARCH_RESULTS = 5
+
+def _search_tools_tool(tools: list[BaseTool]) -> BaseTool:
+    """Build the search_tools tool, which looks up tools by keyword.
+
+    A word from the query scores 2 points when it appears in a tool's name and 1 point when it
+    appears in its description.
+    """
+    def search_tools(query: str) -> tuple[str, list[str]]:
+        words = re.findall(r'\w+', query.lower())
+        scored = []
+        for tool in tools:
+            name, description = tool.name.lower(), tool.description.lower()
+            score = sum(2 * (word in name) + (word in description) for word in words)
+            if score:
+                scored.append((score, tool))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        best = [tool for _, tool in scored[:_TOOL_SEARCH_RESULTS]]
+        if not best:
+            return "No matching tools found.", []
+        return "\n".join(f"{tool.name}: {tool.description}" for tool in best), [tool.name for tool in best]
+
+    return StructuredTool.from_function(
+        func=search_tools,
+        name="search_tools",
+        description=(
+            "Search the available tools by keywords, e.g. 'memory search nodes' or 'web search'. "
+            "Returns the names and descriptions of the best matches, which can be called from the "
+            "next turn on. Use it before calling a tool you haven't used in this conversation."
+        ),
+        response_format="content_and_artifact",
+    )
+
+def _discovered_tools(messages: list[AnyMessage]) -> set[str]:
+    """Names of the tools found by search_tools or called so far in the conversation."""
+    names = set()
+    for message in messages:
+        if isinstance(message, ToolMessage) and message.name == "search_tools" and message.artifact:
+            names.update(message.artifact)
+        elif isinstance(message, AIMessage):
+            names.update(call["name"] for call in message.tool_calls)
+    return names
+
+def _create_tool_search_agent(
+    model: BaseChatModel, tools: list[BaseTool], prompt
+) -> CompiledStateGraph:
+    """ReAct agent that only binds the schemas of the tools the conversation has discovered.
+
+    Binding every schema costs a few hundred tokens per tool on every model call. Here the model
+    starts out with search_tools alone, and each tool it finds or calls is bound from then on.
+    """
+    search_tools = _search_tools_tool(tools)
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
+        discovered = _discovered_tools(state["messages"])
+        bound = [search_tools, *(tool for name, tool in tools_by_name.items() if name in discovered)]
+        response = await model.bind_tools(bound).ainvoke(prompt(state), config)
+        # Like create_react_agent, answer instead of calling more tools when the next tool round
+        # would hit the recursion limit, rather than failing with GraphRecursionError
+        if state["remaining_steps"] < 2 and response.tool_calls:
+            return {
+                "messages": [
+                    AIMessage(id=response.id, content="Sorry, need more steps to process this request.")
+                ]
+            }
+        return {"messages": [response]}
+
+    agent = StateGraph(AgentState)
+    agent.add_node("agent", acall_model)
+    # Every tool can run, so a tool the model already knows by name needs no search first
+    agent.add_node("tools", ToolNode([search_tools, *tools]))
+    agent.set_entry_point("agent")
+    agent.add_conditional_edges("agent", tools_condition, {"tools": "tools", END: END})
+    agent.add_edge("tools", "agent")
+    return agent.compile()
+
+async def initialize_agent(model_name: str | None = None) -> CompiledStateGraph:
     """Initialize the agent with MCP tools.
     
     Args:
         model_name: Optional model name to use. If None, uses settings.DEFAULT_MODEL.
     """
+    _ensure_dirs()
     tools = await get_tools()
     
     # Use the specified model or fall back to default
     actual_model_name = model_name or settings.DEFAULT_MODEL
-    print(f"MODEL SELECTION: {actual_model_name}")
-    
     model = get_model(actual_model_name)
-    print(f"Using model: {actual_model_name} (no fallback)")
+    logger.debug(f"Using model: {actual_model_name} (no fallback)")
     
-    base_agent = create_react_agent(model, tools)
-    
-    # Create the graph
-    graph = StateGraph(AgentState)
-    graph.add_node("agent", base_agent)
-    graph.set_entry_point("agent")
-    graph.add_edge("agent", END)
-    
-    return graph.compile()
+    # Only the direct Anthropic API gets the cache marker. Of the Bedrock Claude models configured
+    # in core.llm, only 3.5 Haiku supports Bedrock prompt caching (3.5 Sonnet v1 doesn't), and
+    # the cache_control block hasn't been verified through ChatBedrock, so Bedrock keeps the
+    # plain SystemMessage.
+    prompt = _cached_instructions_prompt if actual_model_name in AnthropicModelName else _instructions_prompt
+    if len(tools) > settings.MCP_TOOL_SEARCH_THRESHOLD:
+        return _create_tool_search_agent(model, tools, prompt)
+    return create_react_agent(model, tools, prompt=prompt, state_schema=AgentState)
+
+def _agent_is_current() -> bool:
+    """Whether the cached agent was built from the current tool list."""
+    version = mcp_tools_version()
+    return _agent is not None and version is not None and _agent_tools_version == version
 
 async def get_research_assistant():
-    """Get the initialized research assistant agent."""
-    global _agent
-    if _agent is None:
-        _agent = await initialize_agent()
-        # Initialize with empty MemorySaver - will be replaced by service
-        _agent.checkpointer = MemorySaver()
+    """Get the initialized research assistant agent.
+
+    The agent is kept while its tool list is current. Once a missing server comes up or a server
+    changes its tools, it is rebuilt on the next call.
+    """
+    global _agent, _agent_tools_version
+    if _agent_is_current():
+        return _agent
+    async with _agent_lock:
+        if _agent_is_current():
+            return _agent
+        # No checkpointer here, the service attaches its SQLite/Postgres saver. A placeholder
+        # MemorySaver would keep every thread's checkpoints in process memory if it ever stuck.
+        agent = await initialize_agent()
+        if _agent is not None:
+            # Keep the saver the service attached to the agent being replaced
+            agent.checkpointer = _agent.checkpointer
+        _agent, _agent_tools_version = agent, mcp_tools_version()
     return _agent
 
 _agent = None
+_agent_tools_version: int | None = None
+_agent_lock = asyncio.Lock()
 research_assistant = get_research_assistant
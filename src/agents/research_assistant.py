@@ -1,12 +1,11 @@
 from datetime import datetime
+from functools import lru_cache
 from typing import Literal
 
-from langchain_community.tools import DuckDuckGoSearchResults, OpenWeatherMapQueryRun
-from langchain_community.utilities import OpenWeatherMapAPIWrapper
+from langchain_community.tools import DuckDuckGoSearchResults
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import AIMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSerializable
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, MessagesState, StateGraph
 from langgraph.managed import RemainingSteps
 from langgraph.prebuilt import ToolNode
@@ -32,15 +31,18 @@ tools = [web_search, calculator]
 # Add weather tool if API key is set
 # Register for an API key at https://openweathermap.org/api/
 if settings.OPENWEATHERMAP_API_KEY:
+    # Only pull in the weather tool's modules when it is enabled
+    from langchain_community.tools import OpenWeatherMapQueryRun
+    from langchain_community.utilities import OpenWeatherMapAPIWrapper
+
     wrapper = OpenWeatherMapAPIWrapper(
         openweathermap_api_key=settings.OPENWEATHERMAP_API_KEY.get_secret_value()
     )
     tools.append(OpenWeatherMapQueryRun(name="Weather", api_wrapper=wrapper))
 
-current_date = datetime.now().strftime("%B %d, %Y")
-instructions = f"""
+_INSTRUCTIONS_TEMPLATE = """
     You are a helpful research assistant with the ability to search the web and use other tools.
-    Today's date is {current_date}.
+    Today's date is {date}.
 
     NOTE: THE USER CAN'T SEE THE TOOL RESPONSE.
 
@@ -52,15 +54,36 @@ instructions = f"""
     """
 
 
+@lru_cache(maxsize=1)
+def _instructions_for(date: str) -> str:
+    return _INSTRUCTIONS_TEMPLATE.format(date=date)
+
+
+def current_instructions() -> str:
+    """Instructions with today's date, so a long-running service doesn't keep the start-up date."""
+    return _instructions_for(datetime.now().strftime("%B %d, %Y"))
+
+
 def wrap_model(model: BaseChatModel) -> RunnableSerializable[AgentState, AIMessage]:
     model = model.bind_tools(tools)
     preprocessor = RunnableLambda(
-        lambda state: [SystemMessage(content=instructions)] + state["messages"],
+        lambda state: [SystemMessage(content=current_instructions())] + state["messages"],
         name="StateModifier",
     )
     return preprocessor | model
 
 
+@lru_cache
+def _model_runnable(model_name: str) -> RunnableSerializable[AgentState, AIMessage]:
+    """The wrapped model for a model name, composed once instead of on every model call."""
+    return wrap_model(get_model(model_name))
+
+
+@lru_cache(maxsize=1)
+def _llama_guard() -> LlamaGuard:
+    return LlamaGuard()
+
+
 def format_safety_message(safety: LlamaGuardOutput) -> AIMessage:
     content = (
         f"This conversation was flagged for unsafe content: {', '.join(safety.unsafe_categories)}"
@@ -69,13 +92,11 @@ def format_safety_message(safety: LlamaGuardOutput) -> AIMessage:
 
 
 async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
-    m = get_model(config["configurable"].get("model", settings.DEFAULT_MODEL))
-    model_runnable = wrap_model(m)
+    model_runnable = _model_runnable(config["configurable"].get("model", settings.DEFAULT_MODEL))
     response = await model_runnable.ainvoke(state, config)
 
     # Run llama guard check here to avoid returning the message if it's unsafe
-    llama_guard = LlamaGuard()
-    safety_output = await llama_guard.ainvoke("Agent", state["messages"] + [response])
+    safety_output = await _llama_guard().ainvoke("Agent", state["messages"] + [response])
     if safety_output.safety_assessment == SafetyAssessment.UNSAFE:
         return {"messages": [format_safety_message(safety_output)], "safety": safety_output}
 
@@ -93,8 +114,7 @@ async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
 
 
 async def llama_guard_input(state: AgentState, config: RunnableConfig) -> AgentState:
-    llama_guard = LlamaGuard()
-    safety_output = await llama_guard.ainvoke("User", state["messages"])
+    safety_output = await _llama_guard().ainvoke("User", state["messages"])
     return {"safety": safety_output}
 
 
@@ -145,4 +165,5 @@ def pending_tool_calls(state: AgentState) -> Literal["tools", "done"]:
 
 agent.add_conditional_edges("model", pending_tool_calls, {"tools": "tools", "done": END})
 
-research_assistant = agent.compile(checkpointer=MemorySaver())
\ No newline at end of file
+# The service attaches its SQLite/Postgres checkpointer at startup
+research_assistant = agent.compile()
\ No newline at end of file
@@ -1,10 +1,25 @@
 import math
 import re
+from functools import lru_cache
 
 import numexpr
 from langchain_core.tools import BaseTool, tool
 
 
+@lru_cache(maxsize=512)
+def _evaluate(expression: str) -> str:
+    # The only names in scope are constants, so the result depends on the expression alone
+    local_dict = {"pi": math.pi, "e": math.e}
+    output = str(
+        numexpr.evaluate(
+            expression,
+            global_dict={},  # restrict access to globals
+            local_dict=local_dict,  # add common mathematical functions
+        )
+    )
+    return re.sub(r"^\[|\]$", "", output)
+
+
 def calculator_func(expression: str) -> str:
     """Calculates a math expression using numexpr.
 
@@ -20,15 +35,7 @@ def calculator_func(expression: str) -> str:
     """
 
     try:
-        local_dict = {"pi": math.pi, "e": math.e}
-        output = str(
-            numexpr.evaluate(
-                expression.strip(),
-                global_dict={},  # restrict access to globals
-                local_dict=local_dict,  # add common mathematical functions
-            )
-        )
-        return re.sub(r"^\[|\]$", "", output)
+        return _evaluate(expression.strip())
     except Exception as e:
         raise ValueError(
             f'calculator("{expression}") raised error: {e}.'
@@ -1,5 +1,7 @@
+import asyncio
 import json
 import os
+import weakref
 from collections.abc import AsyncGenerator, Generator
 from typing import Any
 
@@ -15,6 +17,10 @@ from schema import (
     UserInput,
 )
 
+# Chat turns are often further apart than httpx's default 5 second keep-alive,
+# so idle connections are kept long enough for the next turn to reuse them.
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=32, keepalive_expiry=60)
+
 
 class AgentClientError(Exception):
     pass
@@ -45,6 +51,9 @@ class AgentClient:
         self.timeout = timeout
         self.info: ServiceMetadata | None = None
         self.agent: str | None = None
+        self._async_clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
         if get_info:
             self.retrieve_info()
         if agent:
@@ -57,6 +66,22 @@ class AgentClient:
             headers["Authorization"] = f"Bearer {self.auth_secret}"
         return headers
 
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # Keep one client per event loop so pooled connections are reused across
+        # calls. A pool is bound to the loop it was opened on, so each loop that
+        # uses this client (e.g. a caller using asyncio.run() per call) gets its own.
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._async_clients[loop] = httpx.AsyncClient(limits=POOL_LIMITS)
+        return client
+
+    async def aclose(self) -> None:
+        """Close the pooled async HTTP client for the running event loop, if one is open."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
     def retrieve_info(self) -> None:
         try:
             response = httpx.get(
@@ -68,7 +93,24 @@ class AgentClient:
         except httpx.HTTPError as e:
             raise AgentClientError(f"Error getting service info: {e}")
 
-        self.info: ServiceMetadata = ServiceMetadata.model_validate(response.json())
+        self._update_info(response.json())
+
+    async def aretrieve_info(self) -> None:
+        client = self._get_async_client()
+        try:
+            response = await client.get(
+                f"{self.base_url}/info",
+                headers=self._headers,
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise AgentClientError(f"Error getting service info: {e}")
+
+        self._update_info(response.json())
+
+    def _update_info(self, data: dict[str, Any]) -> None:
+        self.info: ServiceMetadata = ServiceMetadata.model_validate(data)
         if not self.agent or self.agent not in [a.key for a in self.info.agents]:
             self.agent = self.info.default_agent
 
@@ -89,6 +131,7 @@ class AgentClient:
         model: str | None = None,
         thread_id: str | None = None,
         agent_config: dict[str, Any] | None = None,
+        agent: str | None = None,
     ) -> ChatMessage:
         """
         Invoke the agent asynchronously. Only the final message is returned.
@@ -98,11 +141,13 @@ class AgentClient:
             model (str, optional): LLM model to use for the agent
             thread_id (str, optional): Thread ID for continuing a conversation
             agent_config (dict[str, Any], optional): Additional configuration to pass through to the agent
+            agent (str, optional): Agent to use for this call instead of the client's selected agent
 
         Returns:
             AnyMessage: The response from the agent
         """
-        if not self.agent:
+        agent = agent or self.agent
+        if not agent:
             raise AgentClientError("No agent selected. Use update_agent() to select an agent.")
         request = UserInput(message=message)
         if thread_id:
@@ -111,17 +156,17 @@ class AgentClient:
             request.model = model
         if agent_config:
             request.agent_config = agent_config
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.base_url}/{self.agent}/invoke",
-                    json=request.model_dump(),
-                    headers=self._headers,
-                    timeout=self.timeout,
-                )
-                response.raise_for_status()
-            except httpx.HTTPError as e:
-                raise AgentClientError(f"Error: {e}")
+        client = self._get_async_client()
+        try:
+            response = await client.post(
+                f"{self.base_url}/{agent}/invoke",
+                json=request.model_dump(),
+                headers=self._headers,
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise AgentClientError(f"Error: {e}")
 
         return ChatMessage.model_validate(response.json())
 
@@ -131,6 +176,7 @@ class AgentClient:
         model: str | None = None,
         thread_id: str | None = None,
         agent_config: dict[str, Any] | None = None,
+        agent: str | None = None,
     ) -> ChatMessage:
         """
         Invoke the agent synchronously. Only the final message is returned.
@@ -140,11 +186,13 @@ class AgentClient:
             model (str, optional): LLM model to use for the agent
             thread_id (str, optional): Thread ID for continuing a conversation
             agent_config (dict[str, Any], optional): Additional configuration to pass through to the agent
+            agent (str, optional): Agent to use for this call instead of the client's selected agent
 
         Returns:
             ChatMessage: The response from the agent
         """
-        if not self.agent:
+        agent = agent or self.agent
+        if not agent:
             raise AgentClientError("No agent selected. Use update_agent() to select an agent.")
         request = UserInput(message=message)
         if thread_id:
@@ -155,7 +203,7 @@ class AgentClient:
             request.agent_config = agent_config
         try:
             response = httpx.post(
-                f"{self.base_url}/{self.agent}/invoke",
+                f"{self.base_url}/{agent}/invoke",
                 json=request.model_dump(),
                 headers=self._headers,
                 timeout=self.timeout,
@@ -197,6 +245,7 @@ class AgentClient:
         thread_id: str | None = None,
         agent_config: dict[str, Any] | None = None,
         stream_tokens: bool = True,
+        agent: str | None = None,
     ) -> Generator[ChatMessage | str, None, None]:
         """
         Stream the agent's response synchronously.
@@ -212,11 +261,13 @@ class AgentClient:
             agent_config (dict[str, Any], optional): Additional configuration to pass through to the agent
             stream_tokens (bool, optional): Stream tokens as they are generated
                 Default: True
+            agent (str, optional): Agent to use for this call instead of the client's selected agent
 
         Returns:
             Generator[ChatMessage | str, None, None]: The response from the agent
         """
-        if not self.agent:
+        agent = agent or self.agent
+        if not agent:
             raise AgentClientError("No agent selected. Use update_agent() to select an agent.")
         request = StreamInput(message=message, stream_tokens=stream_tokens)
         if thread_id:
@@ -228,7 +279,7 @@ class AgentClient:
         try:
             with httpx.stream(
                 "POST",
-                f"{self.base_url}/{self.agent}/stream",
+                f"{self.base_url}/{agent}/stream",
                 json=request.model_dump(),
                 headers=self._headers,
                 timeout=self.timeout,
@@ -250,6 +301,7 @@ class AgentClient:
         thread_id: str | None = None,
         agent_config: dict[str, Any] | None = None,
         stream_tokens: bool = True,
+        agent: str | None = None,
     ) -> AsyncGenerator[ChatMessage | str, None]:
         """
         Stream the agent's response asynchronously.
@@ -265,11 +317,13 @@ class AgentClient:
             agent_config (dict[str, Any], optional): Additional configuration to pass through to the agent
             stream_tokens (bool, optional): Stream tokens as they are generated
                 Default: True
+            agent (str, optional): Agent to use for this call instead of the client's selected agent
 
         Returns:
             AsyncGenerator[ChatMessage | str, None]: The response from the agent
         """
-        if not self.agent:
+        agent = agent or self.agent
+        if not agent:
             raise AgentClientError("No agent selected. Use update_agent() to select an agent.")
         request = StreamInput(message=message, stream_tokens=stream_tokens)
         if thread_id:
@@ -278,28 +332,28 @@ class AgentClient:
             request.model = model
         if agent_config:
             request.agent_config = agent_config
-        async with httpx.AsyncClient() as client:
-            try:
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/{self.agent}/stream",
-                    json=request.model_dump(),
-                    headers=self._headers,
-                    timeout=self.timeout,
-                ) as response:
-                    response.raise_for_status()
-                    async for line in response.aiter_lines():
-                        if line.strip():
-                            try:
-                                parsed = self._parse_stream_line(line)
-                                if parsed is None:
-                                    break
-                                yield parsed
-                            except Exception as e:
-                                # Convert any exception during parsing to AgentClientError
-                                raise AgentClientError(f"Error processing stream: {e}")
-            except httpx.HTTPError as e:
-                raise AgentClientError(f"Error: {e}")
+        client = self._get_async_client()
+        try:
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/{agent}/stream",
+                json=request.model_dump(),
+                headers=self._headers,
+                timeout=self.timeout,
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        try:
+                            parsed = self._parse_stream_line(line)
+                            if parsed is None:
+                                break
+                            yield parsed
+                        except Exception as e:
+                            # Convert any exception during parsing to AgentClientError
+                            raise AgentClientError(f"Error processing stream: {e}")
+        except httpx.HTTPError as e:
+            raise AgentClientError(f"Error: {e}")
 
     async def acreate_feedback(
         self, run_id: str, key: str, score: float, kwargs: dict[str, Any] = {}
@@ -312,18 +366,18 @@ class AgentClient:
         See: https://api.smith.langchain.com/redoc#tag/feedback/operation/create_feedback_api_v1_feedback_post
         """
         request = Feedback(run_id=run_id, key=key, score=score, kwargs=kwargs)
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.base_url}/feedback",
-                    json=request.model_dump(),
-                    headers=self._headers,
-                    timeout=self.timeout,
-                )
-                response.raise_for_status()
-                response.json()
-            except httpx.HTTPError as e:
-                raise AgentClientError(f"Error: {e}")
+        client = self._get_async_client()
+        try:
+            response = await client.post(
+                f"{self.base_url}/feedback",
+                json=request.model_dump(),
+                headers=self._headers,
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            response.json()
+        except httpx.HTTPError as e:
+            raise AgentClientError(f"Error: {e}")
 
     def get_history(
         self,
@@ -348,3 +402,28 @@ class AgentClient:
             raise AgentClientError(f"Error: {e}")
 
         return ChatHistory.model_validate(response.json())
+
+    async def aget_history(
+        self,
+        thread_id: str,
+    ) -> ChatHistory:
+        """
+        Get chat history asynchronously.
+
+        Args:
+            thread_id (str, optional): Thread ID for identifying a conversation
+        """
+        request = ChatHistoryInput(thread_id=thread_id)
+        client = self._get_async_client()
+        try:
+            response = await client.post(
+                f"{self.base_url}/history",
+                json=request.model_dump(),
+                headers=self._headers,
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise AgentClientError(f"Error: {e}")
+
+        return ChatHistory.model_validate(response.json())
@@ -56,6 +56,18 @@ class Settings(BaseSettings):
     MEMORY_DIR: str = "memory_data"
     CONFIG_DIR: str = "config"
     MCP_CONFIG_FILE: str = "mcp_config.json"
+    # Seconds between pings of running MCP servers, dead servers are restarted
+    MCP_HEALTH_CHECK_INTERVAL: float = 30.0
+    # MCP servers to start in the background at service startup. The others start on the first
+    # call of one of their tools.
+    MCP_WARMUP_SERVERS: list[str] = []
+    # With more MCP tools than this, the agent finds tools through search_tools instead of
+    # sending every tool schema on each model call
+    MCP_TOOL_SEARCH_THRESHOLD: int = 30
+    # Read-only MCP tools whose results are reused for identical calls within MCP_TOOL_CACHE_TTL
+    # seconds. Calling any other tool of the same server drops that server's cached results.
+    MCP_CACHEABLE_TOOLS: set[str] = {"read_graph", "search_nodes", "open_nodes"}
+    MCP_TOOL_CACHE_TTL: float = 300.0
     
     AUTH_SECRET: SecretStr | None = None
 
@@ -73,6 +85,8 @@ class Settings(BaseSettings):
     # If DEFAULT_MODEL is None, it will be set in model_post_init
     DEFAULT_MODEL: AllModelEnum | None = None  # type: ignore[assignment]
     AVAILABLE_MODELS: set[AllModelEnum] = set()  # type: ignore[assignment]
+    # Models to build MCP agent instances for at startup, so their first request doesn't pay for it
+    PREWARM_MODELS: list[AllModelEnum] = []  # type: ignore[assignment]
 
     OPENWEATHERMAP_API_KEY: SecretStr | None = None
 
@@ -89,6 +103,9 @@ class Settings(BaseSettings):
     )  # Options: DatabaseType.SQLITE or DatabaseType.POSTGRES
     SQLITE_DB_PATH: str = "checkpoints.db"
 
+    # LLM response cache: a SQLite file path, ":memory:" for an in-process cache, or unset to disable
+    LLM_CACHE: str | None = None
+
     # PostgreSQL Configuration
     POSTGRES_USER: str | None = None
     POSTGRES_PASSWORD: SecretStr | None = None
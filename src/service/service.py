@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import warnings
@@ -16,8 +17,19 @@ from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import Command, Interrupt
 from langsmith import Client as LangsmithClient
 
+try:
+    import orjson
+except ImportError:  # orjson comes in with langsmith, but stay usable without it
+    orjson = None
+
 from agents import DEFAULT_AGENT, get_agent, get_all_agent_info
-from agents.mcp_agent import initialize_agent
+from agents.mcp_agent import (
+    initialize_agent,
+    mcp_tools_version,
+    shutdown_mcp_servers,
+    supervise_mcp_servers,
+    warmup_mcp_servers,
+)
 from core import settings
 from memory import initialize_database
 from schema import (
@@ -36,43 +48,64 @@ from service.utils import (
     remove_tool_calls,
 )
 
-# Cache for storing compiled graphs for different models
-_agent_cache: dict[str, CompiledStateGraph] = {}
+# Set up logging and warnings
+warnings.filterwarnings("ignore", category=LangChainBetaWarning)
+logger = logging.getLogger(__name__)
+
+_SSE_DONE = b"data: [DONE]\n\n"
+
+
+def _sse(event: dict[str, Any]) -> bytes:
+    """Encode an event as a server-sent event line."""
+    payload = orjson.dumps(event) if orjson else json.dumps(event).encode()
+    return b"data: " + payload + b"\n\n"
+
+
+def _tag_skip_stream(message: AIMessage) -> None:
+    """Add the skip_stream tag to a message's metadata with a single attribute write."""
+    metadata = getattr(message, "metadata", {})
+    message.metadata = {**metadata, "tags": [*metadata.get("tags", []), "skip_stream"]}
+
+
+def _sse_message(message: ChatMessage) -> bytes:
+    """Encode a message event, letting pydantic serialize the message to JSON in one step."""
+    return b'data: {"type":"message","content":' + message.model_dump_json().encode() + b"}\n\n"
+
+
+# Cache for storing compiled graphs for different models, with the tool list version each one
+# was built from
+_agent_cache: dict[str, tuple[CompiledStateGraph, int | None]] = {}
 # Global reference to the checkpointer/saver
 _saver = None
 
 async def get_agent_with_model(agent_id: str, model_name: str | None = None) -> CompiledStateGraph:
     """Get an agent with a specific model.
     
-    If agent_id is "mcp-agent" and model_name is provided, creates or retrieves a model-specific
-    instance of the agent. Otherwise, falls back to the default agent.
+    If agent_id is "mcp-agent" and model_name is provided and isn't the default model, creates or
+    retrieves a model-specific instance of the agent. Otherwise, falls back to the default agent.
     """
     global _saver
     
-    if agent_id == "mcp-agent" and model_name:
+    # The registered mcp-agent already runs the default model
+    if agent_id == "mcp-agent" and model_name and model_name != settings.DEFAULT_MODEL:
         cache_key = f"{agent_id}:{model_name}"
-        if cache_key not in _agent_cache:
-            print(f"Creating new agent instance for model: {model_name}")
+        agent, tools_version = _agent_cache.get(cache_key, (None, None))
+        # Rebuild an agent made while a server's tools were missing or have changed since
+        if agent is None or tools_version is None or tools_version != mcp_tools_version():
+            logger.info(f"Creating new agent instance for model: {model_name}")
+            # Requests and prewarming only run once the lifespan has set up the checkpointer
+            if _saver is None:
+                raise RuntimeError("The checkpointer must be set up before building agents")
             agent = await initialize_agent(model_name)
+            agent.checkpointer = _saver
             
-            # Make sure new agents get a checkpointer assigned
-            if _saver:
-                agent.checkpointer = _saver
-                print(f"Set checkpointer for model: {model_name}")
-            else:
-                print("WARNING: No checkpointer available to assign to the new agent!")
-                
-            _agent_cache[cache_key] = agent
+            _agent_cache[cache_key] = (agent, mcp_tools_version())
             
-        return _agent_cache[cache_key]
+        return agent
     
     # Fall back to standard agent retrieval for other agent types or when model isn't specified
     return await get_agent(agent_id)
 
-# Set up logging and warnings
-warnings.filterwarnings("ignore", category=LangChainBetaWarning)
-logger = logging.getLogger(__name__)
-
 
 def verify_bearer(
     http_auth: Annotated[
@@ -93,18 +126,29 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     Configurable lifespan that initializes the appropriate database checkpointer based on settings.
     """
     global _saver
+    # Start the MCP_WARMUP_SERVERS in the background so their first tool call finds them running
+    warmup_task = asyncio.create_task(warmup_mcp_servers())
+    supervisor_task = asyncio.create_task(supervise_mcp_servers())
     try:
         async with initialize_database() as saver:
             await saver.setup()
-            agents = get_all_agent_info()
-            for a in agents:
-                agent = await get_agent(a.key)  # Await the async get_agent call
+            # Build all agents concurrently, so their tool discovery overlaps
+            agents = await asyncio.gather(*(get_agent(a.key) for a in get_all_agent_info()))
+            for agent in agents:
                 agent.checkpointer = saver
             _saver = saver  # Store the saver/checkpointer in the global variable
+            await asyncio.gather(
+                *(get_agent_with_model("mcp-agent", model) for model in settings.PREWARM_MODELS)
+            )
             yield
     except Exception as e:
         logger.error(f"Error during database initialization: {e}")
         raise
+    finally:
+        warmup_task.cancel()
+        supervisor_task.cancel()
+        await asyncio.gather(warmup_task, supervisor_task, return_exceptions=True)
+        await shutdown_mcp_servers()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -148,11 +192,14 @@ async def _handle_input(
         run_id=run_id,
     )
 
-    # Check for interrupts that need to be resumed
-    state = await agent.aget_state(config=config)
-    interrupted_tasks = [
-        task for task in state.tasks if hasattr(task, "interrupts") and task.interrupts
-    ]
+    # Check for interrupts that need to be resumed. A thread created for this request has no
+    # checkpoints yet, so there is nothing to look up.
+    interrupted_tasks = []
+    if user_input.thread_id:
+        state = await agent.aget_state(config=config)
+        interrupted_tasks = [
+            task for task in state.tasks if hasattr(task, "interrupts") and task.interrupts
+        ]
 
     if interrupted_tasks:
         # assume user input is response to resume agent execution from interrupt
@@ -204,7 +251,7 @@ async def invoke(user_input: UserInput, agent_id: str = DEFAULT_AGENT) -> ChatMe
 
 async def message_generator(
     user_input: StreamInput, agent_id: str = DEFAULT_AGENT
-) -> AsyncGenerator[str, None]:
+) -> AsyncGenerator[bytes, None]:
     """
     Generate a stream of messages from the agent.
 
@@ -228,7 +275,8 @@ async def message_generator(
         # Check if this is likely the last update
         if stream_mode == "updates":
             # Check if this is the last message in the sequence
-            if event and isinstance(event, dict) and "messages" in list(event.values())[0]:
+            first_update = next(iter(event.values()), None) if isinstance(event, dict) else None
+            if isinstance(first_update, dict) and "messages" in first_update:
                 is_last_update = True
                 
         new_messages = []
@@ -263,6 +311,10 @@ async def message_generator(
             new_messages = [event]
             
         for message in new_messages:
+            # LangGraph re-sends the input message, which feels weird, so drop it before
+            # spending a conversion on it
+            if isinstance(message, HumanMessage) and message.content == user_input.message:
+                continue
             try:
                 chat_message = langchain_to_chat_message(message)
                 chat_message.run_id = str(run_id)
@@ -275,19 +327,10 @@ async def message_generator(
                     not final_ai_message_sent):
                     # Mark that we're skipping the final message because we've streamed it
                     final_ai_message_sent = True
-                    # Add skip_stream tag to this message
-                    if not hasattr(message, "metadata"):
-                        message.metadata = {}
-                    if "tags" not in message.metadata:
-                        message.metadata["tags"] = []
-                    message.metadata["tags"].append("skip_stream")
+                    _tag_skip_stream(message)
             except Exception as e:
                 logger.error(f"Error parsing message: {e}")
-                yield f"data: {json.dumps({'type': 'error', 'content': 'Unexpected error'})}\n\n"
-                continue
-                
-            # LangGraph re-sends the input message, which feels weird, so drop it
-            if chat_message.type == "human" and chat_message.content == user_input.message:
+                yield _sse({"type": "error", "content": "Unexpected error"})
                 continue
                 
             # If it's a tool message with empty tool_call_id, set a temporary ID
@@ -295,7 +338,7 @@ async def message_generator(
                 chat_message.tool_call_id = f"temp_tool_{uuid4()}"
                 logger.warning(f"Found empty tool_call_id, assigned temporary ID: {chat_message.tool_call_id}")
                 
-            yield f"data: {json.dumps({'type': 'message', 'content': chat_message.model_dump()})}\n\n"
+            yield _sse_message(chat_message)
             
         if stream_mode == "messages":
             if not user_input.stream_tokens:
@@ -312,9 +355,9 @@ async def message_generator(
                 # Empty content in the context of OpenAI usually means
                 # that the model is asking for a tool to be invoked.
                 # So we only print non-empty content.
-                yield f"data: {json.dumps({'type': 'token', 'content': convert_message_content_to_string(content)})}\n\n"
+                yield _sse({"type": "token", "content": convert_message_content_to_string(content)})
                 
-    yield "data: [DONE]\n\n"
+    yield _SSE_DONE
 
 
 def _sse_response_example() -> dict[int, Any]:
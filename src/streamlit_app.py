@@ -1,34 +1,91 @@
 import asyncio
+import atexit
+import html
+import json
 import os
+import queue
+import threading
+import time
 import uuid
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Coroutine, Iterator
+from concurrent.futures import Future
+from typing import Any, TypeVar
 
 import streamlit as st
 from dotenv import load_dotenv
 from pydantic import ValidationError
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 
+try:
+    import uvloop
+except ImportError:  # optional; the stdlib loop works too, just with slower socket I/O
+    uvloop = None
+
 from client import AgentClient, AgentClientError
 from schema import ChatHistory, ChatMessage
 from schema.task_data import TaskData, TaskDataStatus
 
-# Handle import for get_tools with fallback options
-try:
-    from agents.mcp_agent import get_tools
-except ModuleNotFoundError:
-    # Try alternative import paths
-    try:
-        from src.agents.mcp_agent import get_tools
-    except ModuleNotFoundError:
-        print("Could not import get_tools from agents.mcp_agent")
-        # Define a placeholder function to avoid breaking the app
-        async def get_tools():
-            return []
+T = TypeVar("T")
 
 
 APP_TITLE = "MCP Agent"
 APP_ICON = "🧰"
 
+# Streamed tokens are written to the page at most this often (seconds), or once
+# this many new characters have arrived, rather than on every token.
+STREAM_FLUSH_INTERVAL = 0.03
+STREAM_FLUSH_CHARS = 40
+
+# Normalized score for each st.feedback("stars") index (0-4)
+FEEDBACK_SCORES = (0.2, 0.4, 0.6, 0.8, 1.0)
+# Seconds a rating has to stay unchanged before it is sent
+FEEDBACK_DEBOUNCE = 0.3
+
+# Quick action tabs: (tab label, heading, ((button label, widget key, prompt), ...))
+# The first two buttons of each tab go in the left column, the rest in the right.
+QUICK_ACTIONS: tuple[tuple[str, str, tuple[tuple[str, str, str], ...]], ...] = (
+    (
+        "Basic Tests",
+        "##### Simple commands to test basic functionality",
+        (
+            ("🛠️ List Available Tools", "list_tools_btn", "What tools do you have available?"),
+            ("📝 Check Memory", "check_history_btn", "What have we discussed before? Please check your memory but don't list your tools again."),
+            ("📅 What's Today's Date?", "date_btn", "What is today's date? Can you also tell me what day of the week it is?"),
+            ("🌐 Current Events", "news_btn", "What are 2-3 recent technology news headlines? Keep your response brief and focused."),
+        ),
+    ),
+    (
+        "File Operations",
+        "##### Test file reading and manipulation capabilities",
+        (
+            ("📂 List Files", "list_files_btn", "Can you list all the files in the data directory?"),
+            ("📄 Read Sample File", "read_file_btn", "Please read the contents of data/todays_date.txt and summarize what you find."),
+            ("📋 Create Note", "create_note_btn", "Can you create a new text file in the data directory named 'test_note.txt' with today's date and a brief greeting?"),
+            ("🔍 Find in Files", "find_in_files_btn", "Search through files in the data directory for any mentions of 'language models' or 'LLMs'."),
+        ),
+    ),
+    (
+        "Complex Tests",
+        "##### More complex multi-step operations",
+        (
+            ("🔄 Process & Transform", "process_btn", "Read data/llms-full.txt if it exists, count how many different LLM providers are mentioned, and create a summary file with the count and list of providers."),
+            ("🧮 Data Analysis", "analysis_btn", "Create a simple dataset of 5 random numbers in a file called 'numbers.txt', then read it back and calculate the average, min, max, and standard deviation."),
+            ("🔍 Research Assistant", "research_btn", "Tell me 2-3 interesting facts about artificial intelligence. Keep your response concise and summarize your findings in a file called 'ai_facts.txt'."),
+            ("📊 Web Data", "web_data_btn", "What is the current weather in San Francisco? Provide a brief summary."),
+        ),
+    ),
+    (
+        "Fun Demos",
+        "##### Fun demonstrations of capabilities",
+        (
+            ("🎨 ASCII Art", "ascii_btn", "Create a simple ASCII art of a cat and save it to a file called 'ascii_cat.txt'."),
+            ("🎮 Text Adventure", "adventure_btn", "Let's play a short text adventure game. I'm in a mysterious forest. What do I see around me? Give me 3 options for what to do next."),
+            ("🎲 Random Challenge", "random_btn", "Generate a random coding challenge for me, then provide a solution in Python and save it to a file called 'challenge_solution.py'."),
+            ("🧩 Puzzle", "puzzle_btn", "Create a logic puzzle for me to solve. After I solve it or give up, create a file with the puzzle and solution."),
+        ),
+    ),
+)
+
 # Optional: map model names to custom avatar images.
 # Replace the URLs with your own images or local file paths as desired.
 MODEL_AVATARS = {
@@ -41,7 +98,169 @@ def model_avatar(model_name: str) -> str | None:
     """Return an avatar image for a given model name, if one is configured."""
     return MODEL_AVATARS.get(model_name)
 
-async def main() -> None:
+def preformatted_html(text: str) -> str:
+    """Text that is still streaming, shown as-is without markdown parsing.
+
+    A <pre> block runs to its closing tag even across blank lines, so escaped text can't
+    fall back into markdown mode.
+    """
+    return f"<pre style='white-space: pre-wrap; font-family: inherit'>{html.escape(text)}</pre>"
+
+def tool_input_markdown(args: dict[str, Any]) -> str:
+    """A tool call's arguments as one markdown block, so they go out as a single element."""
+    return f"Input:\n```json\n{json.dumps(args, indent=2, default=str)}\n```"
+
+def tool_output_markdown(content: str) -> str:
+    return f"Output:\n\n{content}"
+
+def message_fingerprints(msg: ChatMessage) -> list[tuple]:
+    """Keys identifying a message when checking the history for duplicates.
+
+    An AI message counts as a duplicate if either its content or its tool calls were seen before.
+    """
+    match msg.type:
+        case "ai":
+            fingerprints = []
+            if msg.content:
+                fingerprints.append(("ai", msg.content))
+            if msg.tool_calls:
+                fingerprints.append(("ai_tool_calls", json.dumps(msg.tool_calls, sort_keys=True, default=str)))
+            return fingerprints
+        case "tool":
+            return [("tool", msg.tool_call_id, msg.content)]
+        case "custom":
+            return [("custom", json.dumps(msg.custom_data, sort_keys=True, default=str))]
+    return []
+
+def service_options(agent_client: AgentClient) -> dict:
+    """Model and agent choices from the service info, worked out once per session."""
+    if "service_options" not in st.session_state:
+        info = agent_client.info
+        agent_list = [a.key for a in info.agents]
+        st.session_state.service_options = {
+            "models": info.models,
+            "model_idx": info.models.index(info.default_model),
+            "agents": agent_list,
+            "agent_idx": agent_list.index(info.default_agent),
+        }
+    return st.session_state.service_options
+
+def request_new_chat() -> None:
+    st.session_state.start_new_chat = True
+
+class LoopThread:
+    """An asyncio event loop running in a daemon thread.
+
+    The script itself runs synchronously in Streamlit's script thread and hands the
+    AgentClient coroutines to this loop, so every rerun and every session shares one
+    loop and the client's connection pool along with it.
+    """
+
+    _DONE = object()
+
+    def __init__(self) -> None:
+        # Only this loop uses uvloop; Streamlit's own loop is left alone
+        self.loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="agent-client-loop", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        return self.submit(coro).result()
+
+    def iterate(self, agen: AsyncGenerator[T, None]) -> Iterator[T]:
+        """Iterate an async generator from the calling thread."""
+        items: queue.Queue = queue.Queue()
+
+        async def pump() -> None:
+            try:
+                async for item in agen:
+                    items.put(item)
+            except Exception as e:
+                items.put(e)
+            finally:
+                items.put(self._DONE)
+
+        future = self.submit(pump())
+        try:
+            while (item := items.get()) is not self._DONE:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stop pumping if the script stopped reading, e.g. on a rerun
+            future.cancel()
+
+class FeedbackSender:
+    """Sends a session's star ratings from the loop thread.
+
+    Ratings given within FEEDBACK_DEBOUNCE of each other go out as one request carrying the
+    last of them. Only the debounce wait is ever skipped: a request that has started is left
+    to finish, and a rating given meanwhile is sent after it.
+    """
+
+    def __init__(self, loop: LoopThread, agent_client: AgentClient) -> None:
+        self.loop = loop
+        self.agent_client = agent_client
+        self.lock = threading.Lock()
+        # Keeps sends in click order, so an older rating can't overwrite a newer one
+        self.sending = asyncio.Lock()
+        # The rating waiting out the debounce delay, if any
+        self.waiting: tuple[str, float] | None = None
+        # Errors of failed sends, collected on the loop thread until a script run shows them
+        self.errors: list[BaseException] = []
+
+    def rate(self, run_id: str, score: float) -> None:
+        with self.lock:
+            already_waiting = self.waiting is not None
+            self.waiting = (run_id, score)
+        if not already_waiting:
+            self.loop.submit(self.send()).add_done_callback(self.record_error)
+
+    async def send(self) -> None:
+        await asyncio.sleep(FEEDBACK_DEBOUNCE)
+        with self.lock:
+            run_id, score = self.waiting
+            self.waiting = None
+        async with self.sending:
+            await self.agent_client.acreate_feedback(
+                run_id=run_id,
+                key="human-feedback-stars",
+                score=score,
+                kwargs={"comment": "In-line human feedback"},
+            )
+
+    def record_error(self, future: Future) -> None:
+        if not future.cancelled() and (e := future.exception()):
+            with self.lock:
+                self.errors.append(e)
+
+    def take_errors(self) -> list[BaseException]:
+        with self.lock:
+            errors, self.errors = self.errors, []
+        return errors
+
+@st.cache_resource
+def get_event_loop() -> LoopThread:
+    return LoopThread()
+
+@st.cache_resource
+def get_agent_client(agent_url: str) -> AgentClient:
+    """One AgentClient shared by every session connected to this server.
+
+    Sessions pick their agent per call, so nothing session-specific is stored on it.
+    """
+    agent_client = AgentClient(base_url=agent_url, get_info=False)
+    # Close the pooled connections when the server shuts down
+    loop = get_event_loop()
+    atexit.register(lambda: loop.submit(agent_client.aclose()).result(timeout=5))
+    return agent_client
+
+def main() -> None:
     st.set_page_config(
         page_title=APP_TITLE,
         page_icon=APP_ICON,
@@ -49,6 +268,8 @@ async def main() -> None:
         initial_sidebar_state="collapsed",
     )
 
+    loop = get_event_loop()
+    history_task = None
     if "agent_client" not in st.session_state:
         load_dotenv()
         agent_url = os.getenv("AGENT_URL")
@@ -56,13 +277,22 @@ async def main() -> None:
             host = os.getenv("HOST", "0.0.0.0")
             port = os.getenv("PORT", 8080)
             agent_url = f"http://{host}:{port}"
+        agent_client = get_agent_client(agent_url)
+        # A new session opened on an existing thread also needs its history,
+        # so fetch it alongside the service info rather than after it
+        if thread_id := st.query_params.get("thread_id"):
+            history_task = loop.submit(agent_client.aget_history(thread_id=thread_id))
         try:
-            with st.spinner("Connecting to agent service..."):
-                st.session_state.agent_client = AgentClient(base_url=agent_url)
+            if agent_client.info is None:
+                with st.spinner("Connecting to agent service..."):
+                    loop.run(agent_client.aretrieve_info())
         except AgentClientError as e:
+            if history_task:
+                history_task.cancel()
             st.error(f"Error connecting to agent service at {agent_url}: {e}")
             st.markdown("The service might be booting up. Try again in a few seconds.")
             st.stop()
+        st.session_state.agent_client = agent_client
     agent_client: AgentClient = st.session_state.agent_client
 
     # Check for a new chat action
@@ -81,7 +311,11 @@ async def main() -> None:
             messages = []
         else:
             try:
-                messages: ChatHistory = agent_client.get_history(thread_id=thread_id).messages
+                if history_task:
+                    history = history_task.result()
+                else:
+                    history = loop.run(agent_client.aget_history(thread_id=thread_id))
+                messages: ChatHistory = history.messages
             except AgentClientError:
                 st.error("No message history found for this Thread ID.")
                 messages = []
@@ -92,22 +326,18 @@ async def main() -> None:
     with st.sidebar:
         st.header(f"{APP_ICON} {APP_TITLE}")
 
-        # New Chat button at the top of the sidebar
-        if st.button("💬 New Chat", use_container_width=True):
-            st.session_state.start_new_chat = True
-            st.rerun()
+        # New Chat button at the top of the sidebar. The callback runs before the
+        # rerun the click triggers, so that run already starts the new chat.
+        st.button("💬 New Chat", use_container_width=True, on_click=request_new_chat)
 
         # Direct model and agent selectors in the sidebar
         st.subheader("Settings")
-        model_idx = agent_client.info.models.index(agent_client.info.default_model)
-        model = st.selectbox("LLM to use", options=agent_client.info.models, index=model_idx)
-        
-        agent_list = [a.key for a in agent_client.info.agents]
-        agent_idx = agent_list.index(agent_client.info.default_agent)
-        agent_client.agent = st.selectbox(
+        options = service_options(agent_client)
+        model = st.selectbox("LLM to use", options=options["models"], index=options["model_idx"])
+        agent = st.selectbox(
             "Agent to use",
-            options=agent_list,
-            index=agent_idx,
+            options=options["agents"],
+            index=options["agent_idx"],
         )
         use_streaming = st.toggle("Stream results", value=True)
 
@@ -122,99 +352,33 @@ async def main() -> None:
     st.subheader("Quick Actions")
     
     # Create tabs for different categories of tests
-    tabs = st.tabs(["Basic Tests", "File Operations", "Complex Tests", "Fun Demos"])
-    
+    tabs = st.tabs([tab_label for tab_label, _, _ in QUICK_ACTIONS])
+
     # Only show buttons if we're not currently processing a sample input
     if not st.session_state.get("sample_input"):
-        # Basic Tests tab
-        with tabs[0]:
-            st.markdown("##### Simple commands to test basic functionality")
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("🛠️ List Available Tools", key="list_tools_btn", use_container_width=True):
-                    st.session_state.sample_input = "What tools do you have available?"
-                    st.rerun()
-                if st.button("📝 Check Memory", key="check_history_btn", use_container_width=True):
-                    st.session_state.sample_input = "What have we discussed before? Please check your memory but don't list your tools again."
-                    st.rerun()
-            with col2:
-                if st.button("📅 What's Today's Date?", key="date_btn", use_container_width=True):
-                    st.session_state.sample_input = "What is today's date? Can you also tell me what day of the week it is?"
-                    st.rerun()
-                if st.button("🌐 Current Events", key="news_btn", use_container_width=True):
-                    st.session_state.sample_input = "What are 2-3 recent technology news headlines? Keep your response brief and focused."
-                    st.rerun()
-        
-        # File Operations tab
-        with tabs[1]:
-            st.markdown("##### Test file reading and manipulation capabilities")
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("📂 List Files", key="list_files_btn", use_container_width=True):
-                    st.session_state.sample_input = "Can you list all the files in the data directory?"
-                    st.rerun()
-                if st.button("📄 Read Sample File", key="read_file_btn", use_container_width=True):
-                    st.session_state.sample_input = "Please read the contents of data/todays_date.txt and summarize what you find."
-                    st.rerun()
-            with col2:
-                if st.button("📋 Create Note", key="create_note_btn", use_container_width=True):
-                    st.session_state.sample_input = "Can you create a new text file in the data directory named 'test_note.txt' with today's date and a brief greeting?"
-                    st.rerun()
-                if st.button("🔍 Find in Files", key="find_in_files_btn", use_container_width=True):
-                    st.session_state.sample_input = "Search through files in the data directory for any mentions of 'language models' or 'LLMs'."
-                    st.rerun()
-        
-        # Complex Tests tab
-        with tabs[2]:
-            st.markdown("##### More complex multi-step operations")
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("🔄 Process & Transform", key="process_btn", use_container_width=True):
-                    st.session_state.sample_input = "Read data/llms-full.txt if it exists, count how many different LLM providers are mentioned, and create a summary file with the count and list of providers."
-                    st.rerun()
-                if st.button("🧮 Data Analysis", key="analysis_btn", use_container_width=True):
-                    st.session_state.sample_input = "Create a simple dataset of 5 random numbers in a file called 'numbers.txt', then read it back and calculate the average, min, max, and standard deviation."
-                    st.rerun()
-            with col2:
-                if st.button("🔍 Research Assistant", key="research_btn", use_container_width=True):
-                    st.session_state.sample_input = "Tell me 2-3 interesting facts about artificial intelligence. Keep your response concise and summarize your findings in a file called 'ai_facts.txt'."
-                    st.rerun()
-                if st.button("📊 Web Data", key="web_data_btn", use_container_width=True):
-                    st.session_state.sample_input = "What is the current weather in San Francisco? Provide a brief summary."
-                    st.rerun()
-        
-        # Fun Demos tab
-        with tabs[3]:
-            st.markdown("##### Fun demonstrations of capabilities")
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("🎨 ASCII Art", key="ascii_btn", use_container_width=True):
-                    st.session_state.sample_input = "Create a simple ASCII art of a cat and save it to a file called 'ascii_cat.txt'."
-                    st.rerun()
-                if st.button("🎮 Text Adventure", key="adventure_btn", use_container_width=True):
-                    st.session_state.sample_input = "Let's play a short text adventure game. I'm in a mysterious forest. What do I see around me? Give me 3 options for what to do next."
-                    st.rerun()
-            with col2:
-                if st.button("🎲 Random Challenge", key="random_btn", use_container_width=True):
-                    st.session_state.sample_input = "Generate a random coding challenge for me, then provide a solution in Python and save it to a file called 'challenge_solution.py'."
-                    st.rerun()
-                if st.button("🧩 Puzzle", key="puzzle_btn", use_container_width=True):
-                    st.session_state.sample_input = "Create a logic puzzle for me to solve. After I solve it or give up, create a file with the puzzle and solution."
-                    st.rerun()
+        for tab, (_, heading, actions) in zip(tabs, QUICK_ACTIONS):
+            with tab:
+                st.markdown(heading)
+                cols = st.columns(2)
+                for i, (label, key, prompt) in enumerate(actions):
+                    with cols[i // 2]:
+                        if st.button(label, key=key, use_container_width=True):
+                            st.session_state.sample_input = prompt
+                            st.rerun()
+
+    # A rating sent after the last click of an earlier run may have failed since
+    report_feedback_errors()
 
     # --- Chat Area ---
     # Draw existing messages (no welcome message)
     messages: list[ChatMessage] = st.session_state.messages
 
-    async def amessage_iter() -> AsyncGenerator[ChatMessage, None]:
-        for m in messages:
-            yield m
-
-    await draw_messages(amessage_iter())
+    draw_static_messages(messages)
 
     # ---- Retrieve user input ----
     # Use sample query if set; otherwise use manual input.
-    if st.session_state.get("sample_input"):
+    from_sample = bool(st.session_state.get("sample_input"))
+    if from_sample:
         user_input = st.session_state.sample_input
         st.session_state.sample_input = ""  # Clear after reading.
     else:
@@ -222,7 +386,8 @@ async def main() -> None:
 
     # Generate new message if the user provided input
     if user_input:
-        messages.append(ChatMessage(type="human", content=user_input))
+        # Built from a plain string we already hold, so skip validation
+        messages.append(ChatMessage.model_construct(type="human", content=user_input))
         st.chat_message("human").write(user_input)
         try:
             # Store the current model in session state for display with AI messages
@@ -233,17 +398,24 @@ async def main() -> None:
                     message=user_input,
                     model=model,
                     thread_id=st.session_state.thread_id,
+                    agent=agent,
                 )
-                await draw_messages(stream, is_new=True)
+                draw_messages(loop.iterate(stream), is_new=True)
             else:
-                response = await agent_client.ainvoke(
-                    message=user_input,
-                    model=model,
-                    thread_id=st.session_state.thread_id,
+                response = loop.run(
+                    agent_client.ainvoke(
+                        message=user_input,
+                        model=model,
+                        thread_id=st.session_state.thread_id,
+                        agent=agent,
+                    )
                 )
                 messages.append(response)
-                st.chat_message("ai").write(response.content)
-            st.rerun()  # Clear stale containers
+                draw_static_messages([response])
+            # A sample query skipped drawing the quick actions and chat input,
+            # so rerun to bring them back; otherwise the page is already current
+            if from_sample:
+                st.rerun()
         except AgentClientError as e:
             st.error(f"Error generating response: {e}")
             st.stop()
@@ -251,46 +423,165 @@ async def main() -> None:
     # If messages have been generated, show feedback widget
     if len(messages) > 0 and st.session_state.last_message:
         with st.session_state.last_message:
-            await handle_feedback()
+            handle_feedback(loop)
+
+def draw_static_messages(messages: list[ChatMessage]) -> None:
+    """Draw the conversation history.
+
+    This is the counterpart of draw_messages for messages that are already complete, so a
+    rerun skips the streaming and de-duplication bookkeeping. Nothing is added to
+    st.session_state.messages here.
+    """
+    last_message_type = None
+    st.session_state.last_message = None
+    messages_iter = iter(messages)
+
+    for msg in messages_iter:
+        match msg.type:
+            case "human":
+                last_message_type = "human"
+                st.chat_message("human").write(msg.content)
+
+            case "ai":
+                if last_message_type != "ai":
+                    last_message_type = "ai"
+                    model_name = getattr(msg, "model", None) or st.session_state.get("current_model", "AI")
+                    st.session_state.last_message = st.chat_message("ai", avatar=model_avatar(model_name))
+                    with st.session_state.last_message:
+                        st.caption(model_name)
+
+                with st.session_state.last_message:
+                    if msg.content:
+                        st.write(msg.content)
+
+                    if msg.tool_calls:
+                        ids = [tool_call["id"] for tool_call in msg.tool_calls]
+                        statuses = [
+                            st.status(f"Tool Call: {tool_call['name']}", state="complete")
+                            for tool_call in msg.tool_calls
+                        ]
+                        id_to_idx = {id_: i for i, id_ in enumerate(ids)}
+                        for tool_call, status in zip(msg.tool_calls, statuses):
+                            status.markdown(tool_input_markdown(tool_call["args"]))
+
+                        for _ in range(len(statuses)):
+                            tool_result = next(messages_iter, None)
+                            if tool_result is None:
+                                break
+                            if tool_result.type != "tool":
+                                st.error(f"Unexpected ChatMessage type: {tool_result.type}")
+                                st.write(tool_result)
+                                st.stop()
+                            idx = id_to_idx.get(tool_result.tool_call_id)
+                            if idx is None:
+                                idx = 0
+                                st.warning(f"Tool result with id {tool_result.tool_call_id} couldn't be matched to a tool call")
+                            status = statuses[idx]
+                            status.markdown(tool_output_markdown(tool_result.content))
+
+            case "tool":
+                # Tool results are drawn with the AI message that called them
+                if last_message_type != "ai":
+                    st.error(f"Received tool response without a preceding AI message: {msg.tool_call_id}")
+                    st.write(msg.content)
+
+            case "custom":
+                try:
+                    task_data: TaskData = TaskData.model_validate(msg.custom_data)
+                except ValidationError:
+                    st.error("Unexpected CustomData message received from agent")
+                    st.write(msg.custom_data)
+                    st.stop()
+                if last_message_type != "task":
+                    last_message_type = "task"
+                    st.session_state.last_message = st.chat_message(
+                        name="task", avatar=":material/manufacturing:"
+                    )
+                    with st.session_state.last_message:
+                        status = TaskDataStatus()
+                status.add_and_draw_task_data(task_data)
 
-async def draw_messages(
-    messages_agen: AsyncGenerator[ChatMessage | str, None],
+            case _:
+                st.error(f"Unexpected ChatMessage type: {msg.type}")
+                st.write(msg)
+                st.stop()
+
+def draw_messages(
+    messages_iter: Iterator[ChatMessage | str],
     is_new: bool = False,
 ) -> None:
+    # Local aliases for names used on every streamed message
+    session_state = st.session_state
+    history = session_state.messages
+    append_message = history.append
+    # The model is fixed for the whole stream; look it up once
+    current_model = session_state.get("current_model", "AI")
+    current_avatar = model_avatar(current_model)
     last_message_type = None
-    st.session_state.last_message = None
+    session_state.last_message = None
     streaming_content = ""
     streaming_placeholder = None
+    # How much of streaming_content the placeholder shows, and when it was written.
+    # While tokens arrive it shows plain text; it is rendered as markdown once settled.
+    flushed_len = 0
+    last_flush = time.monotonic()
+    settled = True
     # Track whether a final AI message was already appended
     final_message_appended = False
-    # Keep track of seen tool calls and responses for proper history building
-    tool_calls_seen = []
-    tool_responses_seen = []
-    
-    while msg := await anext(messages_agen, None):
+    # Run id of the streamed messages, for an AI message built from streamed tokens
+    run_id = None
+    # Fingerprints of the messages this stream has added. A stream only carries the
+    # new turn, so earlier history isn't checked; the same reply in two different
+    # turns isn't a duplicate anyway.
+    seen: set[tuple] = set()
+
+    def append_if_new(msg: ChatMessage) -> bool:
+        fingerprints = message_fingerprints(msg)
+        if any(fp in seen for fp in fingerprints):
+            return False
+        seen.update(fingerprints)
+        append_message(msg)
+        return True
+
+    for msg in messages_iter:
         if isinstance(msg, str):
             if not streaming_placeholder:
                 if last_message_type != "ai":
                     last_message_type = "ai"
-                    current_model = st.session_state.get("current_model", "AI")
-                    avatar_img = model_avatar(current_model)
-                    st.session_state.last_message = st.chat_message(
+                    session_state.last_message = st.chat_message(
                         "ai",
-                        avatar=avatar_img
+                        avatar=current_avatar
                     )
                     # Show the model name visibly under the avatar
-                    with st.session_state.last_message:
+                    with session_state.last_message:
                         st.caption(current_model)
-                with st.session_state.last_message:
+                with session_state.last_message:
                     streaming_placeholder = st.empty()
             streaming_content += msg
-            streaming_placeholder.write(streaming_content)
+            settled = False
+            now = time.monotonic()
+            if (
+                now - last_flush > STREAM_FLUSH_INTERVAL
+                or len(streaming_content) - flushed_len > STREAM_FLUSH_CHARS
+            ):
+                streaming_placeholder.markdown(
+                    preformatted_html(streaming_content), unsafe_allow_html=True
+                )
+                flushed_len = len(streaming_content)
+                last_flush = now
             continue
-            
+
+        # The streamed text is complete once another message arrives: render it as markdown
+        if streaming_placeholder and not settled:
+            streaming_placeholder.write(streaming_content)
+            flushed_len = len(streaming_content)
+            settled = True
+
         if not isinstance(msg, ChatMessage):
             st.error(f"Unexpected message type: {type(msg)}")
             st.write(msg)
             st.stop()
+        run_id = msg.run_id or run_id
             
         match msg.type:
             case "human":
@@ -300,34 +591,26 @@ async def draw_messages(
             case "ai":
                 # Add message to history if it's new
                 if is_new and (msg.content or msg.tool_calls):
-                    # Only append if it's not a duplicate of what we already have
-                    duplicate = False
-                    for existing in st.session_state.messages:
-                        if (existing.type == "ai" and 
-                            ((msg.content and existing.content == msg.content) or 
-                             (msg.tool_calls and existing.tool_calls == msg.tool_calls))):
-                            duplicate = True
-                            break
-                    
-                    if not duplicate:
-                        # Mark that we've appended an AI message
-                        st.session_state.messages.append(msg)
-                        if msg.content:
-                            final_message_appended = True
+                    # Mark that we've appended an AI message
+                    if append_if_new(msg) and msg.content:
+                        final_message_appended = True
 
                 if last_message_type != "ai":
                     last_message_type = "ai"
-                    model_name = getattr(msg, "model", None) or st.session_state.get("current_model", "AI")
-                    avatar_img = model_avatar(model_name)
-                    st.session_state.last_message = st.chat_message(
+                    model_name = getattr(msg, "model", None)
+                    if model_name and model_name != current_model:
+                        avatar_img = model_avatar(model_name)
+                    else:
+                        model_name, avatar_img = current_model, current_avatar
+                    session_state.last_message = st.chat_message(
                         "ai",
                         avatar=avatar_img
                     )
                     # Show the model name visibly under the avatar
-                    with st.session_state.last_message:
+                    with session_state.last_message:
                         st.caption(model_name)
 
-                with st.session_state.last_message:
+                with session_state.last_message:
                     if msg.content:
                         if streaming_placeholder:
                             # If the streaming content exactly matches the message content,
@@ -336,65 +619,49 @@ async def draw_messages(
                                 streaming_placeholder.write(msg.content)
                             streaming_content = ""
                             streaming_placeholder = None
+                            flushed_len = 0
+                            settled = True
                         else:
                             st.write(msg.content)
 
                     if msg.tool_calls:
-                        # Save tool calls we've seen to track them
-                        for tool_call in msg.tool_calls:
-                            if tool_call not in tool_calls_seen:
-                                tool_calls_seen.append(tool_call)
-
-                        call_results = {}
-                        for tool_call in msg.tool_calls:
-                            status = st.status(
-                                f"Tool Call: {tool_call['name']}",
-                                state="running" if is_new else "complete",
-                            )
-                            call_results[tool_call["id"]] = status
-                            status.write("Input:")
-                            status.write(tool_call["args"])
-
-                        for _ in range(len(call_results)):
+                        # Parallel lists of call ids and their status widgets
+                        state = "running" if is_new else "complete"
+                        ids = [tool_call["id"] for tool_call in msg.tool_calls]
+                        statuses = [
+                            st.status(f"Tool Call: {tool_call['name']}", state=state)
+                            for tool_call in msg.tool_calls
+                        ]
+                        id_to_idx = {id_: i for i, id_ in enumerate(ids)}
+                        for tool_call, status in zip(msg.tool_calls, statuses):
+                            status.markdown(tool_input_markdown(tool_call["args"]))
+
+                        for _ in range(len(statuses)):
                             try:
-                                tool_result: ChatMessage = await anext(messages_agen)
+                                tool_result: ChatMessage = next(messages_iter)
                                 if tool_result.type != "tool":
                                     st.error(f"Unexpected ChatMessage type: {tool_result.type}")
                                     st.write(tool_result)
                                     st.stop()
 
-                                # Track tool responses for history
-                                if tool_result not in tool_responses_seen:
-                                    tool_responses_seen.append(tool_result)
-
                                 # Add tool response to history if it's new
                                 if is_new:
-                                    # Only append if it's not a duplicate
-                                    duplicate = False
-                                    for existing in st.session_state.messages:
-                                        if (existing.type == "tool" and 
-                                            existing.tool_call_id == tool_result.tool_call_id and
-                                            existing.content == tool_result.content):
-                                            duplicate = True
-                                            break
-
-                                    if not duplicate:
-                                        st.session_state.messages.append(tool_result)
-
-                                status = call_results.get(tool_result.tool_call_id)
+                                    append_if_new(tool_result)
+
+                                idx = id_to_idx.get(tool_result.tool_call_id)
+                                status = statuses[idx] if idx is not None else None
                                 # If we can't find the matching tool call, use the first available status
-                                if not status and call_results:
-                                    status = list(call_results.values())[0]
+                                if not status and statuses:
+                                    status = statuses[0]
                                     st.warning(f"Tool result with id {tool_result.tool_call_id} couldn't be matched to a tool call")
 
                                 if status:
-                                    status.write("Output:")
-                                    status.write(tool_result.content)
+                                    status.markdown(tool_output_markdown(tool_result.content))
                                     status.update(state="complete")
                                 else:
                                     st.error(f"Couldn't find a matching tool call for result: {tool_result.tool_call_id}")
                                     st.write(tool_result.content)
-                            except StopAsyncIteration:
+                            except StopIteration:
                                 # If we run out of messages but still expecting tool responses,
                                 # that's an error in the stream
                                 st.error("Stream ended unexpectedly while waiting for tool responses")
@@ -404,22 +671,8 @@ async def draw_messages(
                 # We handle tool messages within the AI message processing
                 # But sometimes tool messages might arrive separately, so handle that case:
                 if is_new:
-                    # Only append if it's not already in our tool_responses_seen list
-                    if msg not in tool_responses_seen:
-                        tool_responses_seen.append(msg)
-                        
-                        # And check it's not a duplicate in history
-                        duplicate = False
-                        for existing in st.session_state.messages:
-                            if (existing.type == "tool" and 
-                                existing.tool_call_id == msg.tool_call_id and
-                                existing.content == msg.content):
-                                duplicate = True
-                                break
-                        
-                        if not duplicate:
-                            st.session_state.messages.append(msg)
-                            
+                    append_if_new(msg)
+
                 # If we get a tool message without seeing the corresponding AI message first,
                 # we need to display it standalone
                 if last_message_type != "ai":
@@ -434,23 +687,14 @@ async def draw_messages(
                     st.write(msg.custom_data)
                     st.stop()
                 if is_new:
-                    # Check for duplicates
-                    duplicate = False
-                    for existing in st.session_state.messages:
-                        if (existing.type == "custom" and 
-                            existing.custom_data == msg.custom_data):
-                            duplicate = True
-                            break
-                            
-                    if not duplicate:
-                        st.session_state.messages.append(msg)
-                        
+                    append_if_new(msg)
+
                 if last_message_type != "task":
                     last_message_type = "task"
-                    st.session_state.last_message = st.chat_message(
+                    session_state.last_message = st.chat_message(
                         name="task", avatar=":material/manufacturing:"
                     )
-                    with st.session_state.last_message:
+                    with session_state.last_message:
                         status = TaskDataStatus()
                 status.add_and_draw_task_data(task_data)
                 
@@ -462,46 +706,43 @@ async def draw_messages(
     # If we've been streaming tokens but never got a final AI message with content,
     # create one from the streamed content when we see [DONE]
     if is_new and streaming_content and not final_message_appended:
-        final_msg = ChatMessage(type="ai", content=streaming_content)
-        
-        # Only add if it's not a duplicate
-        duplicate = False
-        for existing in st.session_state.messages:
-            if (existing.type == "ai" and existing.content == streaming_content):
-                duplicate = True
-                break
-                
-        if not duplicate:
-            st.session_state.messages.append(final_msg)
-            
-        if streaming_placeholder:
-            streaming_placeholder.write(streaming_content)
+        append_if_new(
+            ChatMessage.model_construct(type="ai", content=streaming_content, run_id=run_id)
+        )
+
+    if streaming_placeholder and not settled:
+        streaming_placeholder.write(streaming_content)
 
 
-async def handle_feedback() -> None:
+def report_feedback_errors() -> None:
+    """Show ratings that failed to send since the last script run."""
+    sender: FeedbackSender | None = st.session_state.get("feedback_sender")
+    if sender:
+        for e in sender.take_errors():
+            st.toast(f"Error recording feedback: {e}", icon=":material/error:")
+
+# A fragment, so rating a response reruns only this widget instead of the whole
+# script and every message in the history
+@st.fragment
+def handle_feedback(loop: LoopThread) -> None:
     if "last_feedback" not in st.session_state:
         st.session_state.last_feedback = (None, None)
+    report_feedback_errors()
+
     latest_run_id = st.session_state.messages[-1].run_id
+    # Without a run id the rating can't be attributed, and every such widget would share a key
+    if not latest_run_id:
+        return
     feedback = st.feedback("stars", key=latest_run_id)
-    if feedback is not None and (latest_run_id, feedback) != st.session_state.last_feedback:
-        normalized_score = (feedback + 1) / 5.0
-        agent_client: AgentClient = st.session_state.agent_client
-        try:
-            await agent_client.acreate_feedback(
-                run_id=latest_run_id,
-                key="human-feedback-stars",
-                score=normalized_score,
-                kwargs={"comment": "In-line human feedback"},
-            )
-        except AgentClientError as e:
-            st.error(f"Error recording feedback: {e}")
-            st.stop()
-        st.session_state.last_feedback = (latest_run_id, feedback)
-        st.toast("Feedback recorded", icon=":material/reviews:")
+    if feedback is None or (latest_run_id, feedback) == st.session_state.last_feedback:
+        return
+
+    if "feedback_sender" not in st.session_state:
+        st.session_state.feedback_sender = FeedbackSender(loop, st.session_state.agent_client)
+    st.session_state.feedback_sender.rate(latest_run_id, FEEDBACK_SCORES[feedback])
+    st.session_state.last_feedback = (latest_run_id, feedback)
+    # The send happens after the debounce delay, a failure is reported on a later run
+    st.toast("Sending feedback…", icon=":material/reviews:")
 
 if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except RuntimeError as e:
-        if "Event loop is closed" not in str(e):
-            raise
\ No newline at end of file
+    main()
@@ -0,0 +1,304 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, defaultdict
+from unittest.mock import Mock, PropertyMock, patch
+
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+
+from agents import mcp_agent
+from core.settings import Settings
+
+
+@pytest.fixture
+def mcp_config_file(tmp_path):
+    """Point settings.MCP_CONFIG_FILE_PATH at a temporary file."""
+    path = tmp_path / "mcp_config.json"
+    with patch.object(
+        Settings, "MCP_CONFIG_FILE_PATH", new_callable=PropertyMock, return_value=str(path)
+    ):
+        yield path
+
+
+def test_load_mcp_config_substitutes_settings(mcp_config_file):
+    config = {
+        "servers": {
+            "memory": {
+                "command": "npx",
+                "env": {"DATA": "${DATA_DIR}", "MISSING": "${NOT_A_SETTING}"},
+            }
+        }
+    }
+    mcp_config_file.write_text(json.dumps(config))
+
+    servers = mcp_agent.load_mcp_config()
+
+    assert servers["memory"]["command"] == "npx"
+    assert servers["memory"]["env"] == {"DATA": mcp_agent.settings.DATA_DIR, "MISSING": ""}
+
+
+def test_load_mcp_config_missing_file(mcp_config_file):
+    assert mcp_agent.load_mcp_config() == {}
+
+
+def test_load_mcp_config_invalid_json(mcp_config_file):
+    mcp_config_file.write_text("{not json")
+    assert mcp_agent.load_mcp_config() == {}
+
+
+def test_load_mcp_config_reloads_on_change(mcp_config_file):
+    mcp_config_file.write_text(json.dumps({"servers": {"a": {"command": "a"}}}))
+    first = mcp_agent.load_mcp_config()
+    assert mcp_agent.load_mcp_config() is first
+
+    mcp_config_file.write_text(json.dumps({"servers": {"b": {"command": "b"}}}))
+    mtime = os.path.getmtime(mcp_config_file) + 1
+    os.utime(mcp_config_file, (mtime, mtime))
+
+    assert list(mcp_agent.load_mcp_config()) == ["b"]
+
+
+def test_refresh_tool_manifest_on_changed_tools(tmp_path, monkeypatch):
+    path = tmp_path / "mcp-tools.json"
+    tools = []
+    monkeypatch.setattr(mcp_agent, "_tool_manifest_path", lambda: str(path))
+    monkeypatch.setattr(mcp_agent, "_tools", tools)
+    spec = {"name": "search_nodes", "description": "d", "args_schema": {"type": "object"}}
+    path.write_text(json.dumps({"memory": [spec], "web": []}))
+    client = Mock(get_tools=Mock(return_value=[mcp_agent._lazy_mcp_tool("memory", spec)]))
+
+    mcp_agent._refresh_tool_manifest("memory", client)
+    assert mcp_agent._tools is tools
+
+    new_spec = {**spec, "name": "open_nodes"}
+    client.get_tools.return_value = [mcp_agent._lazy_mcp_tool("memory", new_spec)]
+    mcp_agent._refresh_tool_manifest("memory", client)
+
+    assert json.loads(path.read_text()) == {"memory": [new_spec], "web": []}
+    assert mcp_agent._tools is None
+
+
+def test_search_tools_ranks_name_matches_first():
+    def tool(name: str, description: str) -> StructuredTool:
+        return StructuredTool.from_function(func=lambda: "", name=name, description=description)
+
+    tools = [
+        tool("create_entities", "Create entities in the knowledge graph memory"),
+        tool("search_nodes", "Search the knowledge graph memory for nodes"),
+        tool("perplexity_ask", "Search the web"),
+    ]
+    search_tools = mcp_agent._search_tools_tool(tools)
+
+    content, names = search_tools.func("search memory")
+
+    assert names == ["search_nodes", "create_entities", "perplexity_ask"]
+    assert content.startswith("search_nodes: ")
+    assert search_tools.func("weather") == ("No matching tools found.", [])
+
+
+def test_discovered_tools():
+    messages = [
+        AIMessage(content="", tool_calls=[{"name": "search_tools", "args": {}, "id": "1"}]),
+        ToolMessage(content="", name="search_tools", tool_call_id="1", artifact=["search_nodes"]),
+        AIMessage(content="", tool_calls=[{"name": "open_nodes", "args": {}, "id": "2"}]),
+    ]
+
+    assert mcp_agent._discovered_tools(messages) == {"search_tools", "search_nodes", "open_nodes"}
+
+
+class FakeToolCallingModel(GenericFakeChatModel):
+    """Replays the given messages, and records the tools bound for each call."""
+
+    bound: list[list[str]] = []
+
+    def bind_tools(self, tools):
+        self.bound.append([tool.name for tool in tools])
+        return self
+
+
+def _tool_search_agent(responses: list[AIMessage]):
+    def tool(name: str) -> StructuredTool:
+        return StructuredTool.from_function(
+            func=lambda: f"{name} result", name=name, description=f"{name} memory tool"
+        )
+
+    model = FakeToolCallingModel(messages=iter(responses), bound=[])
+    tools = [tool("search_nodes"), tool("create_entities")]
+    agent = mcp_agent._create_tool_search_agent(model, tools, mcp_agent._instructions_prompt)
+    return agent, model
+
+
+@pytest.mark.asyncio
+async def test_tool_search_agent_binds_discovered_tools():
+    agent, model = _tool_search_agent(
+        [
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "search_tools", "args": {"query": "search"}, "id": "1"}],
+            ),
+            AIMessage(content="", tool_calls=[{"name": "search_nodes", "args": {}, "id": "2"}]),
+            AIMessage(content="Nothing stored yet."),
+        ]
+    )
+
+    result = await agent.ainvoke({"messages": [HumanMessage(content="What do you remember?")]})
+
+    assert result["messages"][-1].content == "Nothing stored yet."
+    assert result["messages"][-2].content == "search_nodes result"
+    assert model.bound[0] == ["search_tools"]
+    assert "search_nodes" in model.bound[1]
+    assert "create_entities" not in model.bound[2]
+
+
+@pytest.mark.asyncio
+async def test_tool_search_agent_stops_before_recursion_limit():
+    search = {"name": "search_tools", "args": {"query": "memory"}}
+    agent, _ = _tool_search_agent(
+        [AIMessage(content="", tool_calls=[{**search, "id": str(i)}]) for i in range(10)]
+    )
+
+    result = await agent.ainvoke(
+        {"messages": [HumanMessage(content="Loop")]}, {"recursion_limit": 6}
+    )
+
+    assert result["messages"][-1].content == "Sorry, need more steps to process this request."
+
+
+@pytest.mark.asyncio
+async def test_cacheable_tool_results_reused_until_other_tool_runs(monkeypatch):
+    calls = []
+
+    async def call_live_tool(server_name, tool_name, arguments):
+        calls.append(tool_name)
+        return f"{tool_name} result", None
+
+    monkeypatch.setattr(mcp_agent, "_call_live_tool", call_live_tool)
+    monkeypatch.setattr(mcp_agent, "_tool_results", defaultdict(OrderedDict))
+    spec = {"args_schema": {"type": "object", "properties": {}}}
+    search = mcp_agent._lazy_mcp_tool(
+        "memory", {**spec, "name": "search_nodes", "description": "d"}
+    )
+    create = mcp_agent._lazy_mcp_tool(
+        "memory", {**spec, "name": "create_entities", "description": "d"}
+    )
+
+    await search.ainvoke({})
+    await search.ainvoke({})
+    assert calls == ["search_nodes"]
+
+    await create.ainvoke({})
+    await search.ainvoke({})
+    assert calls == ["search_nodes", "create_entities", "search_nodes"]
+
+
+@pytest.mark.asyncio
+async def test_research_assistant_rebuilt_when_tools_are_rediscovered(monkeypatch):
+    async def initialize_agent():
+        return Mock(checkpointer=None)
+
+    monkeypatch.setattr(mcp_agent, "initialize_agent", initialize_agent)
+    monkeypatch.setattr(mcp_agent, "_agent", None)
+    monkeypatch.setattr(mcp_agent, "_agent_tools_version", None)
+    monkeypatch.setattr(mcp_agent, "_tools", None)
+
+    partial = await mcp_agent.get_research_assistant()
+    partial.checkpointer = "saver"
+    rebuilt = await mcp_agent.get_research_assistant()
+    assert rebuilt is not partial
+    assert rebuilt.checkpointer == "saver"
+
+    monkeypatch.setattr(mcp_agent, "_tools", [])
+    complete = await mcp_agent.get_research_assistant()
+    assert await mcp_agent.get_research_assistant() is complete
+
+
+@pytest.mark.asyncio
+async def test_supervisor_backs_off_failing_restarts(monkeypatch):
+    attempts = []
+
+    async def connect_server(server_name, restart=False):
+        attempts.append(server_name)
+        return None
+
+    async def not_running(server_name):
+        return False
+
+    backoff = {}
+    monkeypatch.setattr(mcp_agent, "_connect_server", connect_server)
+    monkeypatch.setattr(mcp_agent, "_stop_server", not_running)
+    monkeypatch.setattr(mcp_agent, "is_mcp_server_running", not_running)
+    monkeypatch.setattr(mcp_agent, "_mcp_restart_backoff", backoff)
+    interval = mcp_agent.settings.MCP_HEALTH_CHECK_INTERVAL
+
+    await mcp_agent._supervise_server("memory")
+    await mcp_agent._supervise_server("memory")
+    assert attempts == ["memory"]
+    failures, retry_at = backoff["memory"]
+    assert failures == 1
+    assert retry_at - time.monotonic() == pytest.approx(interval, abs=1)
+
+    # Once the wait is over the next attempt is made, and the wait after it doubles
+    backoff["memory"] = (failures, 0.0)
+    await mcp_agent._supervise_server("memory")
+    assert attempts == ["memory", "memory"]
+    failures, retry_at = backoff["memory"]
+    assert failures == 2
+    assert retry_at - time.monotonic() == pytest.approx(2 * interval, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_failed_server_is_only_restarted_by_the_supervisor(monkeypatch):
+    starts = []
+
+    async def run_server(server_name, ready, stop):
+        starts.append(server_name)
+        ready.set_exception(RuntimeError("spawn failed"))
+
+    monkeypatch.setattr(mcp_agent, "_run_server", run_server)
+    monkeypatch.setattr(mcp_agent, "_mcp_clients", {})
+    monkeypatch.setattr(mcp_agent, "_mcp_started_servers", set())
+
+    assert await mcp_agent._connect_server("memory") is None
+    assert await mcp_agent._connect_server("memory") is None
+    assert starts == ["memory"]
+
+    assert await mcp_agent._connect_server("memory", restart=True) is None
+    assert starts == ["memory", "memory"]
+
+
+@pytest.mark.asyncio
+async def test_cacheable_result_not_stored_when_a_write_overlaps(monkeypatch):
+    calls = []
+    write_started = asyncio.Event()
+    read_done = asyncio.Event()
+
+    async def call_live_tool(server_name, tool_name, arguments):
+        calls.append(tool_name)
+        if tool_name == "create_entities":
+            # The read runs while the write is in flight and sees the old data
+            write_started.set()
+            await read_done.wait()
+        return f"{tool_name} result", None
+
+    monkeypatch.setattr(mcp_agent, "_call_live_tool", call_live_tool)
+    monkeypatch.setattr(mcp_agent, "_tool_results", defaultdict(OrderedDict))
+    spec = {"args_schema": {"type": "object", "properties": {}}}
+    search = mcp_agent._lazy_mcp_tool(
+        "memory", {**spec, "name": "search_nodes", "description": "d"}
+    )
+    create = mcp_agent._lazy_mcp_tool(
+        "memory", {**spec, "name": "create_entities", "description": "d"}
+    )
+
+    write = asyncio.create_task(create.ainvoke({}))
+    await write_started.wait()
+    await search.ainvoke({})
+    read_done.set()
+    await write
+
+    await search.ainvoke({})
+    assert calls == ["create_entities", "search_nodes", "search_nodes"]
@@ -1,6 +1,7 @@
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
+import streamlit as st
 
 from schema import AgentInfo, ServiceMetadata
 from schema.models import OpenAIModelName
@@ -20,7 +21,11 @@ def mock_agent_client(mock_env):
         models=[OpenAIModelName.GPT_4O, OpenAIModelName.GPT_4O_MINI],
     )
 
+    # The app shares one AgentClient across sessions via st.cache_resource
+    st.cache_resource.clear()
     with patch("client.AgentClient") as mock_agent_client:
         mock_agent_client_instance = mock_agent_client.return_value
         mock_agent_client_instance.info = mock_info
+        mock_agent_client_instance.aretrieve_info = AsyncMock()
+        mock_agent_client_instance.aclose = AsyncMock()
         yield mock_agent_client_instance
@@ -47,7 +47,7 @@ def test_app_settings(mock_agent_client):
 
     at.sidebar.toggle[0].set_value(False)  # Use Streaming = False
     assert at.sidebar.selectbox[0].value == "gpt-4o"
-    assert mock_agent_client.agent == "test-agent"
+    assert at.sidebar.selectbox[1].value == "test-agent"
     at.sidebar.selectbox[0].set_value("gpt-4o-mini")
     at.sidebar.selectbox[1].set_value("chatbot")
     at.chat_input[0].set_value(PROMPT).run()
@@ -60,11 +60,11 @@ def test_app_settings(mock_agent_client):
     assert at.chat_message[1].markdown[0].value == RESPONSE
 
     # Check the args match the settings
-    assert mock_agent_client.agent == "chatbot"
     mock_agent_client.ainvoke.assert_called_with(
         message=PROMPT,
         model=OpenAIModelName.GPT_4O_MINI,
         thread_id="test session id",
+        agent="chatbot",
     )
     assert not at.exception
 
@@ -82,11 +82,11 @@ def test_app_thread_id_history(mock_agent_client):
         ChatMessage(type="human", content="What is the weather?"),
         ChatMessage(type="ai", content="The weather is sunny."),
     ]
-    mock_agent_client.get_history.return_value = ChatHistory(messages=HISTORY)
+    mock_agent_client.aget_history = AsyncMock(return_value=ChatHistory(messages=HISTORY))
     at.run()
     print(at)
     assert at.session_state.thread_id == "1234"
-    mock_agent_client.get_history.assert_called_with(thread_id="1234")
+    mock_agent_client.aget_history.assert_called_with(thread_id="1234")
     assert at.chat_message[0].avatar == "user"
     assert at.chat_message[0].markdown[0].value == "What is the weather?"
     assert at.chat_message[1].avatar == "assistant"
@@ -131,13 +131,12 @@ async def test_app_streaming(mock_agent_client):
     assert at.chat_message[0].markdown[0].value == PROMPT
     response = at.chat_message[1]
     tool_status = response.status[0]
-    assert response.avatar == "assistant"
+    # AI messages carry the selected model's avatar
+    assert response.avatar.endswith("/avatars/gpt-4o.png")
     assert tool_status.label == "Tool Call: calculator"
     assert tool_status.icon == ":material/check:"
-    assert tool_status.markdown[0].value == "Input:"
-    assert tool_status.json[0].value == '{"expression": "6 * 7"}'
-    assert tool_status.markdown[1].value == "Output:"
-    assert tool_status.markdown[2].value == "42"
+    assert tool_status.markdown[0].value == 'Input:\n```json\n{\n  "expression": "6 * 7"\n}\n```'
+    assert tool_status.markdown[1].value == "Output:\n\n42"
     assert response.markdown[-1].value == "The answer is 42"
     assert not at.exception
 
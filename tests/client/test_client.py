@@ -112,6 +112,13 @@ async def test_ainvoke(agent_client):
         assert kwargs["json"]["model"] == "gpt-4o"
         assert kwargs["json"]["thread_id"] == "test-thread"
 
+    # Test with a per-call agent
+    with patch("httpx.AsyncClient.post", return_value=mock_response) as mock_post:
+        await agent_client.ainvoke(QUESTION, agent="other-agent")
+        args, kwargs = mock_post.call_args
+        assert args[0] == "http://test/other-agent/invoke"
+        assert agent_client.agent == "test-agent"
+
     # Test error response
     error_response = Response(500, text="Internal Server Error", request=mock_request)
     with patch("httpx.AsyncClient.post", return_value=error_response):
@@ -294,6 +301,35 @@ def test_get_history(agent_client):
         assert "500 Internal Server Error" in str(exc.value)
 
 
+@pytest.mark.asyncio
+async def test_aget_history(agent_client):
+    """Test asynchronous chat history retrieval."""
+    THREAD_ID = "test-thread"
+    HISTORY = {
+        "messages": [
+            {"type": "human", "content": "What is the weather?"},
+            {"type": "ai", "content": "The weather is sunny."},
+        ]
+    }
+
+    # Mock successful response
+    mock_response = Response(200, json=HISTORY, request=Request("POST", "http://test/history"))
+    with patch("httpx.AsyncClient.post", return_value=mock_response) as mock_post:
+        history = await agent_client.aget_history(THREAD_ID)
+        assert isinstance(history, ChatHistory)
+        assert len(history.messages) == 2
+        assert mock_post.call_args.kwargs["json"]["thread_id"] == THREAD_ID
+
+    # Test error response
+    error_response = Response(
+        500, text="Internal Server Error", request=Request("POST", "http://test/history")
+    )
+    with patch("httpx.AsyncClient.post", return_value=error_response):
+        with pytest.raises(AgentClientError) as exc:
+            await agent_client.aget_history(THREAD_ID)
+        assert "500 Internal Server Error" in str(exc.value)
+
+
 def test_info(agent_client):
     assert agent_client.info is None
     assert agent_client.agent == "test-agent"